@@ -54,6 +54,20 @@ import hashlib
 import string
 import random
 import unicodedata
+import collections
+import itertools
+import concurrent.futures
+import threading
+import queue
+import mmap
+import stat
+import struct
+import heapq
+import json
+import signal
+import errno
+import socket
+import ctypes
 
 
 class LPYknife(object):
@@ -73,14 +87,6 @@ class LPYknife(object):
                 return False   # b is NOT False.
         return True
 
-    @staticmethod
-    def get_fileinodev(fpath: str) -> (int, int):
-        try:
-            fstat = os.stat(fpath)
-        except:
-            return (0, 0)
-        return (fstat.st_ino, fstat.st_dev)
-
     @staticmethod
     def isbool(chkvar, varname: str = ''):
         if isinstance(chkvar, bool) != True:
@@ -91,12 +97,29 @@ class LPYknife(object):
         return r
 
     @staticmethod
-    def retry_iter(retry: int = 2, interval: float = 1.0, timeout: float = -1.0):
-        if timeout > 0:
-            retry = int(timeout/interval)
-        for i in range(retry):
+    def parsesize(size: str) -> int:
+        '''
+          Bytes of the size string, K, M, G suffix is 1024 based.
+          e.g. '4096': 4096, '50M': 52428800
+        Return Value: -1 if invalid string.
+        '''
+        units: dict = {'': 1, 'K': 1024, 'M': 1048576, 'G': 1073741824}
+        m = re.match(r'^([0-9]+)([KMG]?)$', size.upper())
+        if m == None:
+            return -1
+        return int(m.group(1)) * units[m.group(2)]
+
+    @staticmethod
+    def backoff_iter(retry: int = 2, interval: float = 1.0, maxinterval: float = 120.0):
+        '''
+          Yield attempt number 0 to retry, sleep between the attempts.
+        The interval is doubled by each attempt, up to maxinterval.
+          e.g. retry=3, interval=1.0: 0, sleep 1, 1, sleep 2, 2, sleep 4, 3
+        '''
+        for i in range(retry + 1):
+            if i >= 1:
+                time.sleep(min(interval * (2 ** (i - 1)), maxinterval))
             yield i
-            time.sleep(interval)
 
     @staticmethod
     def randomstrings(total_len: int, letters: str = string.ascii_letters+string.digits,
@@ -111,14 +134,102 @@ class LPYknife(object):
 
 
 class Const_SHA(object):
+    # BLAKE2B-BITS, BLAKE2S-BITS: digest size, SHAKE128-BITS, SHAKE256-BITS: output length.
     algorithms = ('MD5', 'SHA1', "SHA2-224", "SHA224",
                   "SHA2-256", "SHA256",
                   "SHA2-384", "SHA384",
                   "SHA2-512", "SHA512",
                   "SHA2-512/224", "SHA512-224",
                   "SHA2-512/256", "SHA512-256",
-                  "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512")
+                  "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512",
+                  'BLAKE2B', 'BLAKE2B512', 'BLAKE2S', 'BLAKE2S256',
+                  'SHAKE128', 'SHAKE256', 'SHAKE-128', 'SHAKE-256') +\
+        tuple('BLAKE2B-{0}'.format(bits) for bits in range(128, 513, 8)) +\
+        tuple('BLAKE2S-{0}'.format(bits) for bits in range(128, 257, 8)) +\
+        tuple('SHAKE128-{0}'.format(bits) for bits in range(128, 1025, 8)) +\
+        tuple('SHAKE256-{0}'.format(bits) for bits in range(128, 1025, 8))
+    algorithmset = frozenset(algorithms)  # membership of the algorithms, ordered tuple is for help.
     styles = ('OPENSSL', 'BSD', 'GNU')
+    iomodes = ('READ', 'MMAP', 'AUTO', 'AFALG')
+    iopolicies = ('NORMAL', 'SCRUB')
+    aliases = {'SHA224': 'SHA2-224', 'SHA256': 'SHA2-256',
+               'SHA384': 'SHA2-384', 'SHA512': 'SHA2-512',
+               'SHA512-224': 'SHA2-512/224', 'SHA512-256': 'SHA2-512/256',
+               'BLAKE2B': 'BLAKE2B-512', 'BLAKE2B512': 'BLAKE2B-512',  # b2sum, openssl 1.1
+               'BLAKE2S': 'BLAKE2S-256', 'BLAKE2S256': 'BLAKE2S-256',
+               'SHAKE128': 'SHAKE128-128', 'SHAKE-128': 'SHAKE128-128',  # openssl 3
+               'SHAKE256': 'SHAKE256-256', 'SHAKE-256': 'SHAKE256-256'}
+    hexlengths = {'MD5': 32, 'SHA1': 40,
+                  'SHA2-224': 56, 'SHA2-256': 64, 'SHA2-384': 96, 'SHA2-512': 128,
+                  'SHA2-512/224': 56, 'SHA2-512/256': 64,
+                  'SHA3-224': 56, 'SHA3-256': 64, 'SHA3-384': 96, 'SHA3-512': 128}
+    _guesses: dict = dict()  # hexlength: formal algorithms of list.
+
+    @staticmethod
+    def treealgorithm(algo: str) -> tuple:
+        '''
+          Chunk size and algorithm of the tree digest(Hashtree), TREE<CHUNKSIZE>-<ALGORITHM>.
+        CHUNKSIZE is power of 2, 64K to 1G. e.g. TREE1M-SHA2-256: (1048576, 'SHA2-256')
+        Return Value: (0, '') if not tree digest.
+        '''
+        units: dict = {'K': 1024, 'M': 1048576, 'G': 1073741824}
+        if algo.startswith('TREE') != True or '-' not in algo:
+            return 0, ''
+        size, base = algo[4:].split('-', 1)
+        m = re.match(r'^([0-9]+)([KMG])$', size)
+        if m == None or base not in Const_SHA.algorithmset:
+            return 0, ''
+        chunksize: int = int(m.group(1)) * units[m.group(2)]
+        if chunksize < 65536 or chunksize > 1073741824 or chunksize & (chunksize - 1) != 0:
+            return 0, ''
+        return chunksize, base
+
+    @staticmethod
+    def isalgorithm(algo: str) -> bool:
+        '''
+          algo is the algorithm name(upper case) or the tree digest name.
+        '''
+        if algo in Const_SHA.algorithmset:
+            return True
+        return True if Const_SHA.treealgorithm(algo)[0] != 0 else False
+
+    @staticmethod
+    def hexlength(algo: str) -> int:
+        '''
+          Length of hash digest string of the algorithm.
+          e.g. SHA2-256: 64, BLAKE2B-384: 96, SHAKE128: 32, TREE1M-SHA2-256: 64
+        '''
+        chunksize, base = Const_SHA.treealgorithm(algo)
+        algo = base if chunksize != 0 else algo
+        formal: str = Const_SHA.aliases.get(algo, algo)
+        if formal in Const_SHA.hexlengths:
+            return Const_SHA.hexlengths[formal]
+        return int(formal.rsplit('-', 1)[1]) // 4  # BLAKE2, SHAKE bits.
+
+    @staticmethod
+    def guess_algorithms(hexlength: int) -> list:
+        '''
+          Formal algorithms of the hash digest length, e.g. GNU style row.
+        '''
+        if hexlength not in Const_SHA._guesses:
+            Const_SHA._guesses[hexlength] = sorted(set(
+                Const_SHA.aliases.get(algo, algo) for algo in Const_SHA.algorithms
+                if Const_SHA.hexlength(algo) == hexlength))
+        return Const_SHA._guesses[hexlength]
+
+    @staticmethod
+    def headalgorithm(row: str) -> str:
+        '''
+          Algorithm name on the head of the row, before '(' or ' ('.
+        The name is case-insensitive, e.g. BLAKE2b512(openssl 1.1), BLAKE2b (b2sum --tag)
+        The name is not matched by prefix, SHA2-512/256(...) is not SHA2-512.
+        Return Value: the name as written on the row, '' if not algorithm.
+        '''
+        i: int = row.find('(')
+        if i <= 0:
+            return ''
+        name: str = row[:i - 1] if row[i - 1] == ' ' else row[:i]
+        return name if Const_SHA.isalgorithm(name.upper()) else ''
 
 
 class Args_shacksum(object):
@@ -129,6 +240,7 @@ class Args_shacksum(object):
     def __init__(self):
         self.algorythm: str = ''     # -a, --algorythm, e.g. -a sha2-256, -a sha3-512
         self.check: str = ''     # -c, --check, e.g. -c CHECKSUM.SHA256
+        self.update: str = ''    # --update, e.g. --update CHECKSUM.SHA256
         self.style: str = ''     # --style, e.g. --style openssl, --style bsd
         self.verbose: bool = False   # --verbose
         self.version: bool = False   # --version
@@ -136,6 +248,26 @@ class Args_shacksum(object):
         self.license: bool = False   # --license
         self.stdin:   bool = False   # --stdin
         self.recursive: bool = False  # --recursive, Output recursive fpath.
+        self.jobs: str = ''  # -j, --jobs, e.g. --jobs 8
+        self.walk_jobs: str = ''  # --walk-jobs, e.g. --walk-jobs 16
+        self.unordered: bool = False  # --unordered, Output by completion order.
+        self.io: str = ''  # --io, e.g. --io mmap, --io read, --io auto
+        self.output_prefix: str = ''  # --output-prefix, e.g. --output-prefix CHECKSUM
+        self.cache: str = ''  # --cache, e.g. --cache /var/db/shacksum.cache
+        self.xattr_cache: bool = False  # --xattr-cache
+        self.checkpoint: str = ''  # --checkpoint, e.g. --checkpoint /tmp/shacksum.ckpt
+        self.resume: bool = False  # --resume, Skip the completed files of --checkpoint.
+        self.retry: str = ''  # --retry, e.g. --retry 5
+        self.retry_interval: str = ''  # --retry-interval, e.g. --retry-interval 0.5
+        self.progress: bool = False  # --progress, count the total ahead for ETA.
+        self.tree: str = ''  # --tree, e.g. --tree 1M
+        self.readahead: str = ''  # --readahead, e.g. --readahead 4
+        self.prefetch: str = ''  # --prefetch, e.g. --prefetch 8
+        self.io_policy: str = ''  # --io-policy, e.g. --io-policy scrub
+        self.device_jobs: str = ''  # --device-jobs, e.g. --device-jobs 2
+        self.bwlimit: str = ''  # --bwlimit, e.g. --bwlimit 50M
+        self.iops_limit: str = ''  # --iops-limit, e.g. --iops-limit 200
+        self.ioprio_idle: bool = False  # --ioprio-idle, I/O scheduling class idle.
         if sys.version_info.major == 3 and sys.version_info.minor < 9:
             # e.g. [script] -a sha256 [calcfile1] [file2] ...
             self.calcfiles = list()
@@ -150,6 +282,17 @@ class Args_shacksum(object):
             self._algorithms: typing.Final[tuple] = Const_SHA.algorithms
         self._checkmode: bool = False
         self._calcmode: bool = False
+        self._updatemode: bool = False
+        self._jobs: int = 1  # normalized --jobs value.
+        self._walk_jobs: int = 1  # normalized --walk-jobs value.
+        self._algorythms: list = list()  # e.g. -a sha2-256,sha3-512
+        self._retry: int = 2  # normalized --retry value.
+        self._retry_interval: float = 1.0  # normalized --retry-interval value.
+        self._readahead: int = 0  # normalized --readahead value.
+        self._prefetch: int = 0  # normalized --prefetch value.
+        self._device_jobs: int = 0  # normalized --device-jobs value.
+        self._bwlimit: int = 0  # normalized --bwlimit value, bytes per second.
+        self._iops_limit: int = 0  # normalized --iops-limit value.
         return
 
     def print_attribute(self):
@@ -166,11 +309,42 @@ class Args_shacksum(object):
         arg: str  # s: str; errmes: str
         on_algorythm: bool = False
         on_check: bool = False
+        on_update: bool = False
         on_style: bool = False
+        on_jobs: bool = False
+        on_walk_jobs: bool = False
+        on_io: bool = False
+        on_output_prefix: bool = False
+        on_cache: bool = False
+        on_checkpoint: bool = False
+        on_retry: bool = False
+        on_retry_interval: bool = False
+        on_tree: bool = False
+        on_readahead: bool = False
+        on_prefetch: bool = False
+        on_io_policy: bool = False
+        on_bwlimit: bool = False
+        on_iops_limit: bool = False
+        on_device_jobs: bool = False
         for arg in sys.argv[1:]:
             if arg == '--recursive':
                 self.recursive = True
                 continue
+            if arg == '--unordered':
+                self.unordered = True
+                continue
+            if arg == '--xattr-cache':
+                self.xattr_cache = True
+                continue
+            if arg == '--resume':
+                self.resume = True
+                continue
+            if arg == '--ioprio-idle':
+                self.ioprio_idle = True
+                continue
+            if arg == '--progress':
+                self.progress = True
+                continue
             if arg == '--stdin':
                 self.stdin = True
                 continue
@@ -194,19 +368,131 @@ class Args_shacksum(object):
                 self.check = arg
                 on_check = False
                 continue
+            if on_update:
+                self.update = arg
+                on_update = False
+                continue
             if on_style:
                 self.style = arg
                 on_style = False
                 continue
+            if on_jobs:
+                self.jobs = arg
+                on_jobs = False
+                continue
+            if on_walk_jobs:
+                self.walk_jobs = arg
+                on_walk_jobs = False
+                continue
+            if on_io:
+                self.io = arg
+                on_io = False
+                continue
+            if on_output_prefix:
+                self.output_prefix = arg
+                on_output_prefix = False
+                continue
+            if on_cache:
+                self.cache = arg
+                on_cache = False
+                continue
+            if on_checkpoint:
+                self.checkpoint = arg
+                on_checkpoint = False
+                continue
+            if on_retry:
+                self.retry = arg
+                on_retry = False
+                continue
+            if on_retry_interval:
+                self.retry_interval = arg
+                on_retry_interval = False
+                continue
+            if on_tree:
+                self.tree = arg
+                on_tree = False
+                continue
+            if on_readahead:
+                self.readahead = arg
+                on_readahead = False
+                continue
+            if on_prefetch:
+                self.prefetch = arg
+                on_prefetch = False
+                continue
+            if on_io_policy:
+                self.io_policy = arg
+                on_io_policy = False
+                continue
+            if on_bwlimit:
+                self.bwlimit = arg
+                on_bwlimit = False
+                continue
+            if on_device_jobs:
+                self.device_jobs = arg
+                on_device_jobs = False
+                continue
+            if on_iops_limit:
+                self.iops_limit = arg
+                on_iops_limit = False
+                continue
             if arg == '-a' or arg == '--algorythm':
                 on_algorythm = True
                 continue
             if arg == '-c' or arg == '--check':
                 on_check = True
                 continue
+            if arg == '--update':
+                on_update = True
+                continue
             if arg == '--style':
                 on_style = True
                 continue
+            if arg == '-j' or arg == '--jobs':
+                on_jobs = True
+                continue
+            if arg == '--walk-jobs':
+                on_walk_jobs = True
+                continue
+            if arg == '--io':
+                on_io = True
+                continue
+            if arg == '--output-prefix':
+                on_output_prefix = True
+                continue
+            if arg == '--cache':
+                on_cache = True
+                continue
+            if arg == '--checkpoint':
+                on_checkpoint = True
+                continue
+            if arg == '--retry':
+                on_retry = True
+                continue
+            if arg == '--retry-interval':
+                on_retry_interval = True
+                continue
+            if arg == '--tree':
+                on_tree = True
+                continue
+            if arg == '--readahead':
+                on_readahead = True
+                continue
+            if arg == '--prefetch':
+                on_prefetch = True
+                continue
+            if arg == '--io-policy':
+                on_io_policy = True
+                continue
+            if arg == '--bwlimit':
+                on_bwlimit = True
+                continue
+            if arg == '--device-jobs':
+                on_device_jobs = True
+                continue
+            if arg == '--iops-limit':
+                on_iops_limit = True
+                continue
             self.calcfiles.append(arg)
             continue
         return
@@ -225,6 +511,20 @@ class Args_shacksum(object):
             exit(1)
         self._checkmode = checkmode
         self._calcmode = calcmode
+        self._updatemode = True if self.update != '' else False
+        if self._updatemode:
+            if checkmode:
+                errmes = 'Error: --update and -c, --check option are exclusive.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if calcmode != True:
+                errmes = 'Error: Empty argument files on --update option.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if ',' in self.algorythm or self.output_prefix != '':
+                errmes = 'Error: Invalid multiple --algorythm, --output-prefix option on --update.'
+                print(errmes, file=sys.stderr)
+                exit(1)
         if self.style != '':
             s = self.style.upper()
             if s not in self._styles:
@@ -232,11 +532,18 @@ class Args_shacksum(object):
                 errmes = errmes.format(self.style)
                 print(errmes, file=sys.stderr)
                 exit(1)
-        if calcmode:
-            s = self.algorythm.upper()
-            if s not in self._algorithms:
-                s = 'Error: Not found --algorithm option. [{0}]'
-                errmes = s.format(self.algorythm)
+        if calcmode and (self.algorythm != '' or self._updatemode != True):
+            for s in self.algorythm.upper().split(','):
+                if Const_SHA.isalgorithm(s) != True:
+                    s = 'Error: Not found --algorithm option. [{0}]'
+                    errmes = s.format(self.algorythm)
+                    print(errmes, file=sys.stderr)
+                    exit(1)
+            treechunks = set([Const_SHA.treealgorithm(s)[0]
+                              for s in self.algorythm.upper().split(',')])
+            if self.algorythm != '' and len(treechunks) >= 2:
+                errmes = 'Error: Mixed tree digest and other --algorythm. [{0}]'
+                errmes = errmes.format(self.algorythm)
                 print(errmes, file=sys.stderr)
                 exit(1)
         if checkmode == True:
@@ -244,15 +551,154 @@ class Args_shacksum(object):
                 errmes = 'Error: Invalid -c, --check option on calcmode.'
                 print(errmes, file=sys.stderr)
             s = self.algorythm.upper()
-            if s != '' and s not in self._algorithms:
+            if ',' in s:
+                errmes = 'Error: Multiple --algorythm on checkmode. [{0}]'
+                errmes = errmes.format(self.algorythm)
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if self.output_prefix != '':
+                errmes = 'Error: Invalid --output-prefix option on checkmode.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if s != '' and Const_SHA.isalgorithm(s) != True:
                 s = 'Error: Not found --algorithm option. [{0}]'
                 errmes = s.format(self.algorythm)
                 print(errmes, file=sys.stderr)
                 exit(1)
-        if self.recursive:
-            errmes = 'Error: Not support --recursive option.'
+        if self.jobs != '':
+            if self.jobs.isdigit() != True or int(self.jobs) < 1:
+                errmes = 'Error: Invalid --jobs option value. 1 or more. [{0}]'
+                errmes = errmes.format(self.jobs)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.device_jobs != '':
+            if self.device_jobs.isdigit() != True or int(self.device_jobs) < 1:
+                errmes = 'Error: Invalid --device-jobs option value. 1 or more. [{0}]'
+                errmes = errmes.format(self.device_jobs)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.walk_jobs != '':
+            if self.walk_jobs.isdigit() != True or int(self.walk_jobs) < 1:
+                errmes = 'Error: Invalid --walk-jobs option value. 1 or more. [{0}]'
+                errmes = errmes.format(self.walk_jobs)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.retry != '' and self.retry.isdigit() != True:
+            errmes = 'Error: Invalid --retry option value. 0 or more. [{0}]'
+            errmes = errmes.format(self.retry)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.retry_interval != '':
+            try:
+                if not (0.1 <= float(self.retry_interval) <= 120):
+                    raise ValueError
+            except ValueError:
+                errmes = 'Error: Invalid --retry-interval option value. 0.1 to 120 seconds. [{0}]'
+                errmes = errmes.format(self.retry_interval)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.readahead != '':
+            if self.readahead.isdigit() != True or int(self.readahead) > 64:
+                errmes = 'Error: Invalid --readahead option value. 0 to 64. [{0}]'
+                errmes = errmes.format(self.readahead)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.prefetch != '':
+            if self.prefetch.isdigit() != True or int(self.prefetch) > 1024:
+                errmes = 'Error: Invalid --prefetch option value. 0 to 1024. [{0}]'
+                errmes = errmes.format(self.prefetch)
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if self._updatemode:
+                errmes = 'Error: Invalid --prefetch option on --update.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if Prefetcher.available() != True:
+                errmes = 'Error: --prefetch option is not supported on the OS.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.bwlimit != '' and LPYknife.parsesize(self.bwlimit) < 1024:
+            errmes = 'Error: Invalid --bwlimit option value. 1024 or more bytes, K, M, G. [{0}]'
+            errmes = errmes.format(self.bwlimit)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.iops_limit != '':
+            if self.iops_limit.isdigit() != True or int(self.iops_limit) < 1:
+                errmes = 'Error: Invalid --iops-limit option value. 1 or more. [{0}]'
+                errmes = errmes.format(self.iops_limit)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.io_policy != '' and self.io_policy.upper() not in Const_SHA.iopolicies:
+            errmes = 'Error: Invalid --io-policy option value. NORMAL or SCRUB. [{0}]'
+            errmes = errmes.format(self.io_policy)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.io != '' and self.io.upper() not in Const_SHA.iomodes:
+            errmes = 'Error: Invalid --io option value. READ, MMAP, AUTO or AFALG. [{0}]'
+            errmes = errmes.format(self.io)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.io.upper() == 'AFALG' and Hashafalg.available() != True:
+            errmes = 'Error: --io afalg option is not supported on the OS.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.cache != '' and self.xattr_cache:
+            errmes = 'Error: --cache and --xattr-cache option are exclusive.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.xattr_cache and hasattr(os, 'getxattr') != True:
+            errmes = 'Error: --xattr-cache option is not supported on the OS.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.recursive and checkmode:
+            errmes = 'Error: Invalid --recursive option on checkmode.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.cache != '' and checkmode:
+            # the files are read always, the bit rot of same stat is detected.
+            errmes = 'Error: Invalid --cache option on checkmode.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.xattr_cache and checkmode:
+            # the files are read always, the changed data of same mtime is detected.
+            errmes = 'Error: Invalid --xattr-cache option on checkmode.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.resume and self.checkpoint == '':
+            errmes = 'Error: --resume option needs --checkpoint option.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.device_jobs != '' and (self.jobs == '' or int(self.jobs) < 2):
+            errmes = 'Error: --device-jobs option needs --jobs option, 2 or more.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.checkpoint != '' and self.unordered:
+            errmes = 'Error: --checkpoint and --unordered option are exclusive.'
             print(errmes, file=sys.stderr)
             exit(1)
+        if self.checkpoint != '' and self._updatemode:
+            errmes = 'Error: Invalid --checkpoint option on --update.'
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if self.tree != '':
+            if checkmode or self._updatemode:
+                errmes = 'Error: Invalid --tree option on checkmode and --update.'
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if Const_SHA.treealgorithm('TREE{0}-SHA2-256'.format(self.tree.upper()))[0] == 0:
+                errmes = 'Error: Invalid --tree option value. power of 2, 64K to 1G. [{0}]'
+                errmes = errmes.format(self.tree)
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if any([Const_SHA.treealgorithm(s)[0] != 0 for s in self.algorythm.upper().split(',')]):
+                errmes = 'Error: --tree option and tree digest --algorythm are exclusive. [{0}]'
+                errmes = errmes.format(self.algorythm)
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if hasattr(os, 'pread') != True:
+                errmes = 'Error: --tree option is not supported on the OS.'
+                print(errmes, file=sys.stderr)
+                exit(1)
         return
 
     def normalize(self):
@@ -270,9 +716,36 @@ class Args_shacksum(object):
                 exit(1)
         if self.algorythm != '':
             self.algorythm = self.algorythm.upper()
-            if self.algorythm not in self._algorithms:
-                s = 'Error: Not found --algorithm option. [{0}]'
-                errmes = s.format(self.algorythm)
+            for s in self.algorythm.split(','):
+                if Const_SHA.isalgorithm(s) != True:
+                    s = 'Error: Not found --algorithm option. [{0}]'
+                    errmes = s.format(self.algorythm)
+                    print(errmes, file=sys.stderr)
+                    exit(1)
+        self._jobs = int(self.jobs) if self.jobs != '' else 1
+        self._walk_jobs = int(self.walk_jobs) if self.walk_jobs != '' else 1
+        self._device_jobs = int(self.device_jobs) if self.device_jobs != '' else 0
+        self.io = self.io.upper() if self.io != '' else 'READ'
+        self.io_policy = self.io_policy.upper() if self.io_policy != '' else 'NORMAL'
+        self._retry = int(self.retry) if self.retry != '' else 2
+        self._readahead = int(self.readahead) if self.readahead != '' else 0
+        self._prefetch = int(self.prefetch) if self.prefetch != '' else 0
+        self._bwlimit = LPYknife.parsesize(self.bwlimit) if self.bwlimit != '' else 0
+        self._iops_limit = int(self.iops_limit) if self.iops_limit != '' else 0
+        self._retry_interval = float(
+            self.retry_interval) if self.retry_interval != '' else 1.0
+        if self.cache != '':
+            self.cache = os.path.abspath(self.cache)
+            if os.path.isdir(self.cache):
+                errmes = 'Error: --cache option is directory. [{0}]'.format(
+                    self.cache)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        if self.checkpoint != '':
+            self.checkpoint = os.path.abspath(self.checkpoint)
+            if os.path.isdir(self.checkpoint):
+                errmes = 'Error: --checkpoint option is directory. [{0}]'.format(
+                    self.checkpoint)
                 print(errmes, file=sys.stderr)
                 exit(1)
         if self._checkmode:
@@ -287,6 +760,13 @@ class Args_shacksum(object):
                 print(errmes, file=sys.stderr)
                 exit(1)
             self.check = fpath
+        if self._updatemode:
+            fpath = os.path.abspath(self.update)
+            if os.path.exists(fpath) and os.path.isfile(fpath) != True:
+                errmes = 'Error: Not regular file. [{0}]'.format(self.update)
+                print(errmes, file=sys.stderr)
+                exit(1)
+            self.update = fpath
         if self._calcmode:
             templist: list = list()
             self.calcfiles = [Main_common.unicodenormalized_fpath_exists(
@@ -304,7 +784,15 @@ class Args_shacksum(object):
                     exit(1)
                 templist.append(fpath)
             self.calcfiles = templist
+            if self._updatemode:
+                return  # algorithm and style are loaded by the checkfile.
             self.algorythm = 'SHA2-256' if self.algorythm == '' else self.algorythm
+            if self.tree != '':
+                self.algorythm = ','.join(['TREE{0}-{1}'.format(self.tree.upper(), s)
+                                           for s in self.algorythm.split(',')])
+            for s in self.algorythm.split(','):
+                if s not in self._algorythms:  # deduplication
+                    self._algorythms.append(s)
             self.style = 'OPENSSL' if self.style == '' else self.style
         return
 
@@ -359,17 +847,9 @@ class Hashrowstringstyle():
         s: str
         t: tuple
         style: tuple = _Hashrowstringstyle_style_namedtuple()
-        algonames: typing.Final[tuple[str]] = ('MD5', 'SHA1', "SHA2-224", "SHA224",
-                                               "SHA2-256", "SHA256",
-                                               "SHA2-384", "SHA384",
-                                               "SHA2-512", "SHA512",
-                                               "SHA2-512/224", "SHA512-224",
-                                               "SHA2-512/256", "SHA512-256",
-                                               "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512")
-        for s in algonames:
-            if row.startswith(s):
-                t = style._maketrue(['opensslstyle', 'BSDstyle'])
-                return t
+        if Const_SHA.headalgorithm(row) != '':
+            t = style._maketrue(['opensslstyle', 'BSDstyle'])
+            return t
         return style
 
     @staticmethod
@@ -416,24 +896,13 @@ class Hashrowstringstyle():
 
     def _analyze_afteralgostr(self, row: str) -> tuple:
         hashinfo: str
-        bsdstyle: str
-        opensslstyle: str
         style: tuple = _Hashrowstringstyle_style_namedtuple()
-        hashinfos: tuple = ('MD5', 'SHA1', "SHA2-224", "SHA224",
-                            "SHA2-256", "SHA256",
-                            "SHA2-384", "SHA384",
-                            "SHA2-512", "SHA512",
-                            "SHA2-512/224", "SHA512-224",
-                            "SHA2-512/256", "SHA512-256",
-                            "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512")
-        for hashinfo in hashinfos:
-            bsdstyle = '{0} '.format(hashinfo)
-            opensslstyle = '{0}('.format(hashinfo)
-            if row.startswith(bsdstyle):
-                return style._maketrue(['BSDstyle'])
-            elif row.startswith(opensslstyle):
-                return style._maketrue(['opensslstyle'])
-        return style  # Not match.
+        hashinfo = Const_SHA.headalgorithm(row)
+        if hashinfo == '':
+            return style  # Not match.
+        if row[len(hashinfo)] == ' ':
+            return style._maketrue(['BSDstyle'])
+        return style._maketrue(['opensslstyle'])
 
     def _analyze_head32(self, row: str) -> tuple:
         style: tuple = _Hashrowstringstyle_style_namedtuple()
@@ -505,41 +974,16 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
     stylename: str = ''
     fpath_abs: str = ''
 
-    def __getvar_hashinfos(self) -> tuple:
-        _hashinfos: tuple = ('MD5', 'SHA1', "SHA2-224", "SHA224",
-                             "SHA2-256", "SHA256",
-                             "SHA2-384", "SHA384",
-                             "SHA2-512", "SHA512",
-                             "SHA2-512/224", "SHA512-224",
-                             "SHA2-512/256", "SHA512-256",
-                             "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512")
-        return _hashinfos
-
-    def __getvar_hashlengths(self) -> dict:
-        _hashlength: dict = {'MD5': 32,
-                             'SHA1': 40,
-                             "SHA2-224": 56, "SHA224": 56,
-                             "SHA2-256": 64, "SHA256": 64,
-                             "SHA2-384": 96, "SHA384": 96,
-                             "SHA2-512": 128, "SHA512": 128,
-                             "SHA2-512/224": 56, "SHA512-224": 56,
-                             "SHA2-512/256": 64, "SHA512-256": 64,
-                             "SHA3-224": 56, "SHA3-256": 64,
-                             "SHA3-384": 96, "SHA3-512": 128}
-        return _hashlength
-
     def _getheadstr_hashalgorithm(self, row: str) -> str:
-        hashinfos: tuple = self.__getvar_hashinfos()
-        for s in hashinfos:
-            if row.startswith(s):
-                return s
-        return ''
+        '''
+          Algorithm name on the head of the row, as written on the row.
+        '''
+        return Const_SHA.headalgorithm(row)
 
     def _gettailstr_hashdgst(self, hashalgo: str, row: str) -> str:
         sidx: int
         epnt: int
-        hashlengths: dict = self.__getvar_hashlengths()
-        hashlen: int = hashlengths[hashalgo]
+        hashlen: int = Const_SHA.hexlength(hashalgo.upper())
         ptn: str = r''.join([r'[0-9a-f]{', str(hashlen), r'}$'])
         mobj = re.search(ptn, row)
         if mobj == None:
@@ -568,14 +1012,12 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
         if epnt == -1:
             return reterr
         tmpstr = row[:epnt]
-        ptn = '{0} ('.format(hashalgo)
-        fpath = tmpstr.replace(ptn, '', 1)  # replace ptn to '' at once
+        fpath = tmpstr[len(hashalgo) + 2:]  # remove 'ALGORITHM ('
         if os.path.isabs(fpath):
             fpath_abs = fpath   # fpath is absolute
         else:
-            fname: str = os.path.basename(fpath)  # fpath is relative
-            fpath_abs: str = os.path.abspath(os.path.join(basedir, fname))
-        return self._make([hashdg, fpath, hashalgo, [''], 'BSDstyle', fpath_abs])
+            fpath_abs: str = os.path.abspath(os.path.join(basedir, fpath))  # fpath is relative
+        return self._make([hashdg, fpath, hashalgo.upper(), [''], 'BSDstyle', fpath_abs])
 
     def _makeinfo_opensslstyle(self, row_arg: str, basedir: str) -> typing.NamedTuple:
         errmes: str
@@ -585,24 +1027,12 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
             errmes = 'Error: row_arg is not string type on _makeinfo_opensslstyle()'
             raise TypeError(errmes)
         row: str = row_arg.strip()
-        hashalgo: str = ''
-        hashinfos: tuple = self.__getvar_hashinfos()
-        for s in hashinfos:
-            if row.startswith(s):
-                hashalgo = s
-                break
+        hashalgo: str = self._getheadstr_hashalgorithm(row)
         if hashalgo == '':
             return reterr
-        sidx: int
-        epnt: int
-        hashlengths: dict = self.__getvar_hashlengths()
-        hashlen: int = hashlengths[hashalgo]
-        ptn: str = r''.join([r'[0-9a-f]{', str(hashlen), r'}$'])
-        mobj = re.search(ptn, row)
-        if mobj == None:
+        hashdg: typing.Final[str] = self._gettailstr_hashdgst(hashalgo, row)
+        if hashdg == '':
             return reterr
-        sidx, epnt = mobj.span()
-        hashdg: typing.Final[str] = row[sidx: epnt]
         fpath: str
         tmpstr: str
         ptn = ')= {0}'.format(hashdg)
@@ -610,13 +1040,12 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
         if epnt == -1:
             return reterr
         tmpstr = row[:epnt]
-        ptn = '{0}('.format(hashalgo)
-        fpath = tmpstr.replace(ptn, '', 1)  # replace ptn to '' at once
+        fpath = tmpstr[len(hashalgo) + 1:]  # remove 'ALGORITHM('
         if os.path.isabs(fpath):
             fpath_abs = fpath   # fpath is absolute
         else:
             fpath_abs: str = os.path.abspath(os.path.join(basedir, fpath))
-        return self._make([hashdg, fpath, hashalgo, [''], 'opensslstyle', fpath_abs])
+        return self._make([hashdg, fpath, hashalgo.upper(), [''], 'opensslstyle', fpath_abs])
 
     def _makeinfo_GNUstyle(self, row_arg: str, basedir: str) -> typing.NamedTuple:
         errmes: str
@@ -625,13 +1054,7 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
         row: str = ''
         hashdg: str = ''
         fpath: str = ''
-        hashlengths: dict = {}
         algo_guess: list[str] = []
-        algo: str = ''
-        length: int = ''
-        ptn: str = ''
-        tempset: set = set()
-        fname: str = ''
         fpath_abs: str = ''
         if isinstance(row_arg, str) != True:
             errmes = 'Error: row_arg is not string type on _makeinfo_opensslstyle()'
@@ -642,33 +1065,12 @@ class _Hashinfo_namedtuple(typing.NamedTuple):
             return reterr
         hashdg = templist[0]
         fpath = templist[1]
-        hashlengths = self.__getvar_hashlengths()
-        for algo, length in hashlengths.items():
-            ptn = r''.join([r'^[0-9a-f]{', str(length), r'}$'])
-            mobj = re.match(ptn, hashdg)
-            if mobj == None:
-                continue
-            algo_guess.append(algo)
-
-        def alias_to_formal(algo: str):
-            hashalgo_alias = {'SHA224': 'SHA2-224',
-                              'SHA256': 'SHA2-256',
-                              'SHA384': 'SHA2-384',
-                              'SHA512': 'SHA2-512',
-                              "SHA512-224": "SHA2-512/224",
-                              'SHA512-256': 'SHA2-512/256'}
-            for k, v in hashalgo_alias.items():
-                if algo == k:
-                    return v
-            return algo
-        templist = [alias_to_formal(algo) for algo in algo_guess]
-        tempset = set(templist)
-        algo_guess = list(tempset)
+        if re.match(r'^[0-9a-f]+$', hashdg) != None:
+            algo_guess = list(Const_SHA.guess_algorithms(len(hashdg)))
         if os.path.isabs(fpath):
             fpath_abs = fpath   # fpath is absolute
         else:
-            fname = os.path.basename(fpath)  # fpath is relative
-            fpath_abs = os.path.abspath(os.path.join(basedir, fname))
+            fpath_abs = os.path.abspath(os.path.join(basedir, fpath))  # fpath is relative
         return self._make([hashdg, fpath, '', algo_guess, 'GNUstyle', fpath_abs])
 
 
@@ -682,114 +1084,1561 @@ class _CalcHashInfo_namedtuple(typing.NamedTuple):
     matched: bool = False
 
 
-class Runcheckmode(object):
-    @staticmethod
-    def getrowinfo_hash(row: str, basedir: str) -> _Hashinfo_namedtuple:
-        normrow: str = row.strip()
-        if normrow.startswith('#'):
-            return None
-        style = Hashrowstringstyle()
-        style.analyze(row)
-        if LPYknife.allfalse([style.guess.opensslstyle, style.guess.BSDstyle, style.guess.GNUstyle]):
-            return None
-        rowinfo = _Hashinfo_namedtuple()
-        if style.guess.opensslstyle:
-            rowinfo = rowinfo._makeinfo_opensslstyle(row, basedir)
-        if style.guess.BSDstyle:
-            rowinfo = rowinfo._makeinfo_BSDstyle(row, basedir)
-        if style.guess.GNUstyle:
-            rowinfo = rowinfo._makeinfo_GNUstyle(row, basedir)
-        if len(rowinfo.hashdg) == 0:
-            return None
-        return rowinfo
+class Hashjobpool(object):
+    '''
+      Worker pool for hash calculation.
+    hashlib releases the GIL on update(), The threads run in parallel.
+    '''
 
-    @staticmethod
-    def calc(rowinfo: _Hashinfo_namedtuple, algo: str = '') -> _CalcHashInfo_namedtuple:
-        kind: str
-        matched: bool
-        kind = algo if algo != '' else rowinfo.algo
-        flag, errmes, hashdg = Main_common.calc_fhashdgst(
-            rowinfo.fpath_abs, kind)
-        if flag != True:
-            calculated = _CalcHashInfo_namedtuple(
-                '', rowinfo.fpath, kind, rowinfo.fpath_abs, errmes, False)
-            return calculated  # Error
-        matched = True if rowinfo.hashdg == hashdg else False
-        calculated = _CalcHashInfo_namedtuple(
-            hashdg, rowinfo.fpath, kind, rowinfo.fpath_abs, '', matched)
-        return calculated
+    def __init__(self, jobs: int, window: int = 0, executor=None):
+        '''
+        jobs(int)  : number of worker threads.
+        window(int): max number of submitted and not yielded items.
+            0: jobs * 2
+        executor   : shared ThreadPoolExecutor, not shut down by imap().
+            None: new executor of jobs threads by each imap().
+        '''
+        if isinstance(jobs, int) != True or jobs < 1:
+            errmes = 'Error: jobs is 1 or more int type. [{0}]'.format(
+                repr(jobs))
+            raise ValueError(errmes)
+        self.jobs: int = jobs
+        self.window: int = window if window > 0 else jobs * 2
+        self.executor = executor
+        return
 
     @staticmethod
-    def print_resultcalc(calchash: _CalcHashInfo_namedtuple, rowinfo, fp, printabs: bool = False, printwithabs: bool = False):
-        mes: str
-        errmes: str
-        fpath: str
+    def _pop_done(pending, ordered: bool, block: bool):
+        '''
+          Pop finished items from pending deque.
+        pending(deque): (item, future) of deque.
+        ordered(bool) : True: head of pending only, False: any finished.
+        block(bool)   : True: wait one item at least.
+        '''
+        results: list = list()
+        if ordered:
+            while len(pending) >= 1:
+                item, fut = pending[0]
+                if block != True and fut.done() != True:
+                    break
+                pending.popleft()
+                results.append((item, fut.result()))
+                block = False
+            return results
+        if block and len(pending) >= 1:
+            concurrent.futures.wait([fut for item, fut in pending],
+                                    return_when=concurrent.futures.FIRST_COMPLETED)
+        remain: list = list()
+        for item, fut in pending:
+            if fut.done():
+                results.append((item, fut.result()))
+            else:
+                remain.append((item, fut))
+        pending.clear()
+        pending.extend(remain)
+        return results
+
+    def imap(self, func, iterable, ordered: bool = True, keyof=None, perkey: int = 0):
+        '''
+          Yield (item, func(item)) calculated on the worker threads.
+        The items in iterable are loaded lazily, the workers start before
+        end of iterable(e.g. sys.stdin).
+        The submitted items are limited by self.window, memory is bounded.
+        ordered(bool):
+            True : yield by input order.
+            False: yield by completion order.
+        keyof(function): key of the item, e.g. st_dev of the file. see imap_bykey().
+        perkey(int): max number of running items of each key.
+            0: not limited, keyof is not used.
+        '''
+        if keyof != None and perkey >= 1:
+            for result in self.imap_bykey(func, iterable, keyof, perkey, ordered=ordered):
+                yield result
+            return
+        pending = collections.deque()
+        executor = self.executor
+        if executor == None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.jobs)
         try:
-            fp.flush()
-        except:
-            errmes = 'Error: fp is not file pointer, print_resultcalc()'
-            raise TypeError(errmes)
-        fpath = calchash.fpath_abs if printabs == True else calchash.fpath
-        if calchash.matched:
-            mes = 'OK[{0}]: {1}'.format(calchash.algo, fpath)
-            mes = unicodedata.normalize('NFD', mes)
-            print(mes, file=fp)
-        else:
-            mes = 'NG[{0}]: {1}\n  hashdg(checkfile): {2}\n  hashdg(calc)     : {3}\n  Error: {4}'
-            mes = mes.format(calchash.algo, fpath, rowinfo.hashdg,
-                             calchash.hashdg, calchash.errmes)
-            mes = unicodedata.normalize('NFD', mes)
-            print(mes, file=fp)
-            ''' mes = 'NG[{0}]: {1}'.format(calchash.algo, fpath);
-            mes = unicodedata.normalize('NFD', mes);
-            print(mes, file=fp);
-            mes = '  hashdg(checkfile): {0}\n  hashdg(calc)     : {1}'.format(rowinfo.hashdg, calchash.hashdg)
-            mes = unicodedata.normalize('NFD', mes);
-            print(mes, file=fp);
-            mes = '  Error: {0}'.format(calchash.errmes)
-            print(mes, file=fp); '''
-        if printwithabs:
-            mes = '  absolutepath: {0}'.format(calchash.fpath_abs)
-            mes = unicodedata.normalize('NFD', mes)
-            print(mes, file=fp)
+            for item in iterable:
+                pending.append((item, executor.submit(func, item)))
+                block = True if len(pending) >= self.window else False
+                for result in self._pop_done(pending, ordered, block):
+                    yield result
+            while len(pending) >= 1:
+                for result in self._pop_done(pending, ordered, True):
+                    yield result
+        finally:
+            for item, fut in pending:
+                fut.cancel()
+            if executor != self.executor:
+                executor.shutdown(wait=True)
         return
 
-    def run(self, normargs: Args_shacksum):
-        checkdirname: str = ''
-        templist: list = []
-        rowinfo_list: list = []
-        rowinfo: str = ''
-        calchash: _CalcHashInfo_namedtuple
-        matched_list: list[bool] = []
-        checkdirname = os.path.dirname(normargs.check)
-        with open(normargs.check, 'rt') as fp:
-            templist = [Runcheckmode.getrowinfo_hash(
-                row, checkdirname) for row in fp]
-        rowinfo_list = [namedtpl for namedtpl in templist if namedtpl != None]
-        for rowinfo in rowinfo_list:
-            if rowinfo.stylename in ['opensslstyle', 'BSDstyle']:
-                calchash = self.calc(rowinfo)
-                self.print_resultcalc(
-                    calchash, rowinfo, sys.stdout, printabs=False, printwithabs=False)
-                matched_list.append(calchash.matched)
-            elif rowinfo.stylename == 'GNUstyle':
-                if normargs.algorythm == '':
-                    errmes = 'Error: Not found --algorythm option.'
-                    print(errmes, file=sys.stderr)
-                    exit(1)
-                calchash = self.calc(rowinfo, algo=normargs.algorythm)
-                self.print_resultcalc(
-                    calchash, rowinfo, sys.stdout, printabs=False, printwithabs=False)
-                matched_list.append(calchash.matched)
-        if len(matched_list) == 0:
-            exit(1)
-        elif all(matched_list):
-            exit(0)
-        else:
-            exit(1)
-
-
-class Runcalcmode(object):
+    def imap_bykey(self, func, iterable, keyof, perkey: int, ordered: bool = True):
+        '''
+          imap() by the queue of each key, e.g. the device of the file.
+        The items wait on the queue of the key, perkey items of the key run at most.
+        The free worker takes the item from the keys by round robin,
+        one busy device is not hammered by all workers while the others are idle.
+        The window is jobs * 32 at least, the items of the other keys are found ahead.
+        The key None is not limited(e.g. hard link, not read).
+        '''
+        pending = collections.deque()  # (item, future) by input order.
+        queues = collections.OrderedDict()  # key: deque of waiting (item, future).
+        running: dict = collections.Counter()  # key: number of running items.
+        state: dict = {'running': 0, 'closed': False}
+        lock = threading.Lock()
+        window: int = max(self.window, self.jobs * 32)
+        executor = self.executor
+        if executor == None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.jobs)
+
+        def dispatch():
+            '''
+              Submit the waiting items to the free workers, called with the lock.
+            '''
+            while state['closed'] != True and state['running'] < self.jobs:
+                for key in queues.keys():
+                    if key == None or running[key] < perkey:
+                        break
+                else:
+                    return  # all keys are busy.
+                waiting = queues[key]
+                item, fut = waiting.popleft()
+                if len(waiting) == 0:
+                    del queues[key]
+                else:
+                    queues.move_to_end(key)  # round robin.
+                if fut.set_running_or_notify_cancel() != True:
+                    continue
+                running[key] += 1
+                state['running'] += 1
+                executor.submit(run, key, item, fut)
+            return
+
+        def run(key, item, fut):
+            try:
+                fut.set_result(func(item))
+            except BaseException as e:  # raised by fut.result() on the caller.
+                fut.set_exception(e)
+            finally:
+                with lock:
+                    running[key] -= 1
+                    state['running'] -= 1
+                    dispatch()
+            return
+        try:
+            for item in iterable:
+                fut = concurrent.futures.Future()
+                pending.append((item, fut))
+                key = keyof(item)
+                with lock:
+                    queues.setdefault(key, collections.deque()).append((item, fut))
+                    dispatch()
+                block = True if len(pending) >= window else False
+                for result in self._pop_done(pending, ordered, block):
+                    yield result
+            while len(pending) >= 1:
+                for result in self._pop_done(pending, ordered, True):
+                    yield result
+        finally:
+            with lock:
+                state['closed'] = True
+            for item, fut in pending:
+                fut.cancel()
+            if executor != self.executor:
+                executor.shutdown(wait=True)
+        return
+
+
+class Hashbufferpool(object):
+    '''
+      Pool of read buffers for calc_fhashdgst().
+    The buffers are reused by readinto(), Not allocate bytes on every block.
+    Each worker thread acquire() a buffer and release() it after calculation.
+    '''
+
+    def __init__(self, maxbuffers: int = 4, maxbytes: int = 268435456):
+        '''
+        maxbuffers(int): max number of the buffers kept on the pool.
+        maxbytes(int): max total bytes of the buffers kept on the pool, 256M.
+        '''
+        self.maxbuffers: int = maxbuffers
+        self.maxbytes: int = maxbytes
+        self._buffers: list = list()
+        self._zeros: bytes = b''  # read only, shared by the threads.
+        self._lock = threading.Lock()
+        return
+
+    def zeros(self, size: int) -> memoryview:
+        '''
+          Zero filled bytes of size, hash data of the holes of sparse file.
+        The buffer is allocated at once, not read from the storage.
+        '''
+        with self._lock:
+            if len(self._zeros) < size:
+                self._zeros = bytes(size)
+            return memoryview(self._zeros)[:size]
+
+    def acquire(self, size: int) -> bytearray:
+        '''
+          Get the buffer, the length is size or longer.
+        '''
+        buf: bytearray
+        with self._lock:
+            self._buffers.sort(key=len)  # smallest fit, 20M is not used for 1M.
+            for i, buf in enumerate(self._buffers):
+                if len(buf) >= size:
+                    return self._buffers.pop(i)
+        return bytearray(size)
+
+    def release(self, buf: bytearray):
+        '''
+          Return the buffer to the pool.
+        '''
+        with self._lock:
+            total: int = sum(len(b) for b in self._buffers)
+            if len(self._buffers) < self.maxbuffers and total + len(buf) <= self.maxbytes:
+                self._buffers.append(buf)
+            elif len(self._buffers) >= 1:  # keep the larger buffers.
+                self._buffers.sort(key=len)
+                if len(self._buffers[0]) < len(buf) and\
+                   total - len(self._buffers[0]) + len(buf) <= self.maxbytes:
+                    self._buffers[0] = buf
+        return
+
+
+class Hashreader(object):
+    '''
+      Read the file by blocks for calc_fhashdgst().
+    The read is resumed from the offset of last good block on error, the file is opened again.
+    The holes of sparse file are the zero buffer, not read from the storage.
+    blocks() : read on the caller thread, reading and hashing alternate.
+    readahead(): read on the reader thread, the blocks are queued up to depth.
+      The disk is not idle while hashing, the latency of network filesystem is hidden.
+    scrub: the read ranges are dropped from the page cache(FADV_DONTNEED) by dropbytes,
+      the file is opened again with O_NOATIME. see --io-policy scrub.
+    '''
+    dropbytes: int = 8388608  # 8M
+
+    def __init__(self, fp, fpath: str, filesize: int, blocksize: int, sparse: bool = False,
+                 retry: int = 2, interval: float = 1.0, maxinterval: float = 120.0,
+                 scrub: bool = False, throttle=None):
+        self.fp = fp  # replaced if the file is opened again, the caller closes it.
+        self.fpath: str = fpath
+        self.filesize: int = filesize
+        self.blocksize: int = blocksize
+        self.sparse: bool = sparse
+        self.retry: int = retry
+        self.interval: float = interval
+        self.maxinterval: float = maxinterval
+        self.scrub: bool = scrub
+        self.throttle = throttle  # Iothrottle, None: unlimited.
+        self.ok: bool = False  # True if read to the end of file.
+        return
+
+    def blocks(self, views: list = None):
+        '''
+          Yield memoryview of the blocks read completely, by order of the file.
+        views(list): memoryview of buffers, used in rotation.
+          The block must be consumed before len(views) blocks later are yielded.
+            None: a buffer of the bufferpool.
+        self.ok is set True when the end of file is reached, False if read error.
+        '''
+        bufs: list = list()
+        if views == None:
+            bufs = [Main_common.bufferpool.acquire(self.blocksize)]
+            views = [memoryview(buf) for buf in bufs]
+        offset: int = 0
+        dataend: int = 0 if self.sparse else self.filesize  # end of the data extent.
+        failures: int = 0  # retry count at the offset.
+        needseek: bool = False
+        dropped: int = 0  # offset dropped from the page cache, scrub.
+        i: int = 0
+        try:
+            while True:
+                if self.sparse and offset >= dataend:
+                    # the hole is the zero buffer, not read from the storage.
+                    start, dataend = Main_common._nextdata(self.fp.fileno(), offset, self.filesize)
+                    while offset < start:
+                        zeros = Main_common.bufferpool.zeros(min(self.blocksize, start - offset))
+                        offset += len(zeros)
+                        yield zeros
+                    if offset >= self.filesize:
+                        self.ok = True
+                        break
+                    needseek = True
+                view = views[i % len(views)]
+                if self.throttle != None:
+                    self.throttle.acquire(min(self.blocksize, dataend - offset))
+                try:
+                    if needseek:
+                        self.fp.seek(offset)
+                        needseek = False
+                    n = self.fp.readinto(view[:min(self.blocksize, dataend - offset)])
+                except (OSError, ValueError):
+                    failures += 1
+                    if failures > self.retry:
+                        break
+                    time.sleep(min(self.interval * (2 ** (failures - 1)), self.maxinterval))
+                    try:
+                        self.fp.close()
+                        # e.g. stale file handle on NFS.
+                        self.fp = Main_common._open(self.fpath, noatime=self.scrub)
+                        self.fp.seek(offset)
+                    except OSError:
+                        pass
+                    continue
+                if n == 0 or n == None:
+                    self.ok = True if offset >= self.filesize else False
+                    break
+                offset += n
+                failures = 0
+                i += 1
+                if self.scrub and offset - dropped >= self.dropbytes:
+                    Main_common._fadvise(self.fp, dropped, offset - dropped, 'DONTNEED')
+                    dropped = offset
+                yield view[:n]
+                if offset >= self.filesize:
+                    self.ok = True
+                    break
+        finally:
+            if len(bufs) >= 1:
+                for view in views:
+                    view.release()
+            for buf in bufs:
+                Main_common.bufferpool.release(buf)
+        return
+
+    def readahead(self, depth: int):
+        '''
+          Yield the blocks same as blocks(), read by the reader thread.
+        depth(int): max number of the blocks read and not yielded.
+        '''
+        bufs: list = [Main_common.bufferpool.acquire(self.blocksize) for i in range(depth + 2)]
+        views: list = [memoryview(buf) for buf in bufs]  # depth + reading + hashing.
+        blocks = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+        end = object()
+        errors: list = list()
+
+        def reader():
+            try:
+                for block in self.blocks(views):
+                    while stop.is_set() != True:
+                        try:
+                            blocks.put(block, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            except BaseException as e:  # raised again on the caller thread.
+                errors.append(e)
+            blocks.put(end)
+            return
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        try:
+            while True:
+                block = blocks.get()
+                if block is end:
+                    break
+                yield block
+            if len(errors) >= 1:
+                raise errors[0]
+        finally:
+            stop.set()
+            while thread.is_alive():
+                try:
+                    blocks.get(timeout=0.1)  # unblock the reader.
+                except queue.Empty:
+                    pass
+            for view in views:
+                view.release()
+            for buf in bufs:
+                Main_common.bufferpool.release(buf)
+        return
+
+
+class Digestcache(object):
+    '''
+      Persistent digest cache file, keyed by stat of the file and the algorithm.
+    key  : (st_dev, st_ino, algorithm)
+    check: (st_size, st_mtime_ns, st_ctime_ns), the file is changed if mismatch.
+    The records are fixed length and sorted by key,
+    The file is searched on mmap by bisection, not loaded at once.
+    New records are merged by save(), stale and not used records are evicted.
+    '''
+    magic: bytes = b'SHACKSUM-CACHE01'  # 16 bytes header.
+    # dev, ino, algorithm, size, mtime_ns, ctime_ns, used, digest length, digest
+    record = struct.Struct('>QQ16sQqqQB64s7x')
+    keylen: int = 32  # dev, ino, algorithm
+    maxage: int = 7776000  # 90 days, evict the records not used.
+
+    def __init__(self, fpath: str):
+        self.fpath: str = fpath
+        self._lock = threading.Lock()
+        self._new: dict = dict()  # key: record bytes
+        self._used: set = set()  # keys of hit records on the file.
+        self._mm = None
+        self._count: int = 0  # number of records on the file.
+        self._now: int = int(time.time())
+        self._open()
+        return
+
+    def _open(self):
+        errmes: str
+        headlen: int = len(self.magic)
+        try:
+            fp = open(self.fpath, 'rb')
+        except FileNotFoundError:
+            return  # new cache file.
+        with fp:
+            size: int = os.fstat(fp.fileno()).st_size
+            if size == headlen and fp.read(headlen) == self.magic:
+                return  # no records.
+            if size < headlen or fp.read(headlen) != self.magic or\
+               (size - headlen) % self.record.size != 0:
+                errmes = 'Warning: Invalid cache file, rebuild it. [{0}]'.format(
+                    self.fpath)
+                print(errmes, file=sys.stderr)
+                return
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = (size - headlen) // self.record.size
+        return
+
+    @classmethod
+    def makekey(cls, fstat: os.stat_result, algo: str) -> bytes:
+        algo = Const_SHA.aliases.get(algo, algo)
+        name: bytes = algo.encode()
+        if len(name) > 16:
+            name = hashlib.md5(name).digest()  # e.g. TREE256K-SHA2-512/256
+        return struct.pack('>QQ16s', fstat.st_dev, fstat.st_ino, name)
+
+    def _search(self, key: bytes) -> bytes:
+        '''
+          Search the record on the file by bisection.
+        Return Value: record bytes, b'' if not found.
+        '''
+        headlen: int = len(self.magic)
+        recsize: int = self.record.size
+        lo: int = 0
+        hi: int = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = headlen + mid * recsize
+            midkey = self._mm[offset: offset + self.keylen]
+            if midkey < key:
+                lo = mid + 1
+            elif midkey > key:
+                hi = mid
+            else:
+                return self._mm[offset: offset + recsize]
+        return b''
+
+    def lookup(self, fpath: str, fstat: os.stat_result, algo: str) -> str:
+        '''
+          Return Value: hash digest string, '' if not found or the file is changed.
+        '''
+        key: bytes = self.makekey(fstat, algo)
+        with self._lock:
+            rec = self._new.get(key, b'')
+        onfile: bool = False
+        if rec == b'' and self._mm != None:
+            rec = self._search(key)
+            onfile = True
+        if rec == b'':
+            return ''
+        dev, ino, algoname, size, mtime_ns, ctime_ns, used, dlen, dgst = self.record.unpack(
+            rec)
+        if (size, mtime_ns, ctime_ns) != (fstat.st_size, fstat.st_mtime_ns, fstat.st_ctime_ns):
+            return ''  # stale, the file is changed.
+        if onfile:
+            with self._lock:
+                self._used.add(key)
+        return dgst[:dlen].hex()
+
+    def store(self, fpath: str, fstat: os.stat_result, algo: str, hashdg: str):
+        dgst: bytes = bytes.fromhex(hashdg)
+        if len(dgst) > 64:
+            return  # too long digest, not cached.
+        key: bytes = self.makekey(fstat, algo)
+        rec: bytes = self.record.pack(fstat.st_dev, fstat.st_ino, key[16:],
+                                      fstat.st_size, fstat.st_mtime_ns, fstat.st_ctime_ns,
+                                      self._now, len(dgst), dgst)
+        with self._lock:
+            self._new[key] = rec
+        return
+
+    def _iterator_file(self):
+        '''
+          Yield records on the file, except replaced and not used records.
+        '''
+        headlen: int = len(self.magic)
+        recsize: int = self.record.size
+        for i in range(self._count):
+            offset = headlen + i * recsize
+            rec = self._mm[offset: offset + recsize]
+            key = rec[:self.keylen]
+            if key in self._new:
+                continue  # replaced.
+            if key in self._used:
+                rec = rec[:56] + struct.pack('>Q', self._now) + rec[64:]
+            elif self._now - struct.unpack('>Q', rec[56:64])[0] > self.maxage:
+                continue  # evict, not used long time.
+            yield rec
+        return
+
+    def save(self):
+        '''
+          Merge new records and write the cache file atomically.
+        '''
+        errmes: str
+        if len(self._new) == 0 and len(self._used) == 0:
+            return
+        tmppath: str = '{0}.{1}.tmp'.format(self.fpath, os.getpid())
+        newrecs: list = [self._new[key] for key in sorted(self._new.keys())]
+        try:
+            with open(tmppath, 'wb') as fp:
+                fp.write(self.magic)
+                for rec in heapq.merge(self._iterator_file(), newrecs,
+                                       key=lambda rec: rec[:self.keylen]):
+                    fp.write(rec)
+            if self._mm != None:
+                self._mm.close()
+                self._mm = None
+            os.replace(tmppath, self.fpath)
+        except OSError as e:
+            errmes = 'Warning: Can not write the cache file. [{0}] {1}'.format(
+                self.fpath, e)
+            print(errmes, file=sys.stderr)
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+        return
+
+
+class Xattrcache(object):
+    '''
+      Digest cache on extended attribute of the file, user.shacksum.<algorithm>.
+    value: '<st_mtime_ns>:<st_size>:<hash digest>'
+    The cache travels with the file(e.g. rsync -X) and survives renames.
+    The interface is same as Digestcache.
+    '''
+    prefix: str = 'user.shacksum.'
+
+    def __init__(self):
+        self.enable: bool = True if hasattr(os, 'getxattr') else False
+        self._warned: bool = False
+        return
+
+    @classmethod
+    def attrname(cls, algo: str) -> str:
+        algo = Const_SHA.aliases.get(algo, algo)
+        return cls.prefix + algo.lower().replace('/', '-')
+
+    def lookup(self, fpath: str, fstat: os.stat_result, algo: str) -> str:
+        '''
+          Return Value: hash digest string, '' if not found or the file is changed.
+        '''
+        if self.enable != True:
+            return ''
+        try:
+            value: str = os.getxattr(fpath, self.attrname(algo)).decode('ascii')
+            mtime_ns, size, hashdg = value.split(':')
+        except (OSError, ValueError):
+            return ''
+        if (mtime_ns, size) != (str(fstat.st_mtime_ns), str(fstat.st_size)):
+            return ''  # stale, the file is changed.
+        return hashdg
+
+    def store(self, fpath: str, fstat: os.stat_result, algo: str, hashdg: str):
+        errmes: str
+        if self.enable != True:
+            return
+        value: str = '{0}:{1}:{2}'.format(
+            fstat.st_mtime_ns, fstat.st_size, hashdg)
+        try:
+            os.setxattr(fpath, self.attrname(algo), value.encode('ascii'))
+        except OSError as e:  # e.g. read-only, not owner, not support.
+            if self._warned != True:
+                errmes = 'Warning: Can not set extended attribute. [{0}] {1}'.format(
+                    fpath, e)
+                print(errmes, file=sys.stderr)
+                self._warned = True
+        return
+
+    def save(self):
+        return
+
+
+class Hashmulti(object):
+    '''
+      Hash objects of several algorithms, updated by one read pass.
+    The interface is same as hashlib object, update() and copy().
+    '''
+
+    def __init__(self, hashobjs: list):
+        self.hashobjs: list = hashobjs
+        return
+
+    def update(self, data):
+        for s in self.hashobjs:
+            s.update(data)
+        return
+
+    def copy(self):
+        return Hashmulti([s.copy() for s in self.hashobjs])
+
+    def hexdigests(self) -> list:
+        return [s.hexdigest() for s in self.hashobjs]
+
+
+class Hashshake(object):
+    '''
+      SHAKE128, SHAKE256 hash object of fixed output length.
+    The interface is same as hashlib object, hexdigest() has no length argument.
+    '''
+
+    def __init__(self, shake, length: int):
+        self._shake = shake  # hashlib.shake_128(), hashlib.shake_256()
+        self.length: int = length  # output bytes.
+        return
+
+    def update(self, data):
+        self._shake.update(data)
+        return
+
+    def copy(self):
+        return Hashshake(self._shake.copy(), self.length)
+
+    def digest(self) -> bytes:
+        return self._shake.digest(self.length)
+
+    def hexdigest(self) -> str:
+        return self._shake.hexdigest(self.length)
+
+
+class Hashafalg(object):
+    '''
+      Hash digest by the Linux kernel crypto API(AF_ALG socket), --io afalg.
+    The file is sent to the kernel by os.sendfile(), not copied to the user space.
+    The kernel may use the crypto accelerator(e.g. CPU instructions, crypto engine).
+    The algorithm not supported by the kernel is calculated by hashlib(fallback).
+    '''
+    kernelnames: dict = {'MD5': 'md5', 'SHA1': 'sha1',
+                         'SHA2-224': 'sha224', 'SHA2-256': 'sha256',
+                         'SHA2-384': 'sha384', 'SHA2-512': 'sha512',
+                         'SHA3-224': 'sha3-224', 'SHA3-256': 'sha3-256',
+                         'SHA3-384': 'sha3-384', 'SHA3-512': 'sha3-512'}
+    sendfilemax: int = 0x7ffff000  # max bytes of one sendfile() on Linux.
+    _tfms: dict = dict()  # formal kind: bound AF_ALG socket, None if not supported.
+    _lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return True if hasattr(socket, 'AF_ALG') and hasattr(os, 'sendfile') else False
+
+    @classmethod
+    def tfm(cls, kind: str):
+        '''
+          Bound AF_ALG socket of the kind, shared by the threads(accept() is thread safe).
+        Return Value: socket, None if the kind is not supported by the kernel.
+        '''
+        formal: str = Const_SHA.aliases.get(kind, kind)
+        with cls._lock:
+            if formal not in cls._tfms:
+                tfm = None
+                if cls.available() and formal in cls.kernelnames:
+                    try:
+                        tfm = socket.socket(socket.AF_ALG, socket.SOCK_SEQPACKET, 0)
+                        tfm.bind(('hash', cls.kernelnames[formal]))
+                    except OSError:  # e.g. EAFNOSUPPORT, ENOENT(no module)
+                        if tfm != None:
+                            tfm.close()
+                        tfm = None
+                cls._tfms[formal] = tfm
+            return cls._tfms[formal]
+
+    @classmethod
+    def calc(cls, fp, filesize: int, kinds: list) -> list:
+        '''
+          Calculate the hash digests of the file by the kernel.
+        Not throttled, one sendfile() is not limited by the blocks. see calc_fhashdgsts().
+        The file is sent by each kind, the second and later are read from the page cache.
+        Return Value: hexdigests by order of kinds,
+          Empty: some kind is not supported, or failure(calculate by hashlib).
+        '''
+        tfms: list = [cls.tfm(kind) for kind in kinds]
+        if None in tfms:
+            return []
+        hexdigests: list = list()
+        for kind, tfm in zip(kinds, tfms):
+            try:
+                op = tfm.accept()[0]
+            except OSError:
+                return []
+            try:
+                if filesize <= cls.sendfilemax:
+                    # one sendfile(), the hash is finalized by the end of the data.
+                    if filesize >= 1 and os.sendfile(op.fileno(), fp.fileno(), 0, filesize) != filesize:
+                        return []
+                else:
+                    offset: int = 0
+                    while offset < filesize:
+                        data = os.pread(fp.fileno(), 1048576, offset)
+                        if len(data) == 0:
+                            return []
+                        op.sendall(data, socket.MSG_MORE)
+                        offset += len(data)
+                    op.send(b'')
+                hexdigests.append(op.recv(Const_SHA.hexlength(kind) // 2).hex())
+            except OSError:
+                return []
+            finally:
+                op.close()
+        return hexdigests
+
+
+class Hashtree(object):
+    '''
+      Tree(Merkle) hash digest of the file by fixed chunks, TREE<CHUNKSIZE>-<ALGORITHM>.
+    The chunks are calculated in parallel, one large file scales with the threads.
+      leaf: H(0x00 + chunk), node: H(0x01 + left + right)
+      The odd node of the level is promoted to upper level(same as THEX).
+      The root of one chunk file is the leaf, empty file is H(0x00).
+    The interface of the result is same as Hashmulti, hexdigests().
+    '''
+    jobs: int = os.cpu_count() or 1  # threads of the shared executor.
+    blocksize: int = 1048576  # 1M, the chunk is streamed into the leaf by blocks.
+    _executor = None
+    _lock = threading.Lock()
+
+    def __init__(self, hashobjs: list, chunksize: int, scrub: bool = False):
+        self.hashobjs: list = hashobjs  # empty hash objects, copied by each node.
+        self.chunksize: int = chunksize
+        self.scrub: bool = scrub  # the chunk is dropped from the page cache after read.
+        self._stack: list = list()  # (height, digests) of the subtrees.
+        self._root: list = list()
+        return
+
+    @classmethod
+    def executor(cls):
+        '''
+          Shared executor of all files, --jobs threads hash the chunks at most.
+        '''
+        with cls._lock:
+            if cls._executor == None:
+                cls._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=cls.jobs)
+            return cls._executor
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            if cls._executor != None:
+                cls._executor.shutdown(wait=False)
+                cls._executor = None
+        return
+
+    def _leaf(self, blocks) -> list:
+        '''
+          Leaf digests of the chunk, blocks(iterable) are updated in order.
+        The chunk is not joined on the memory, large chunk(1G) is read by blocks.
+        '''
+        hashs: list = [hashobj.copy() for hashobj in self.hashobjs]
+        for h in hashs:
+            h.update(b'\x00')
+        for block in blocks:
+            for h in hashs:
+                h.update(block)
+        return [h.digest() for h in hashs]
+
+    def _node(self, lefts: list, rights: list) -> list:
+        digests: list = list()
+        for hashobj, left, right in zip(self.hashobjs, lefts, rights):
+            h = hashobj.copy()
+            h.update(b'\x01')
+            h.update(left)
+            h.update(right)
+            digests.append(h.digest())
+        return digests
+
+    def _push(self, digests: list):
+        '''
+          Push the leaf, merge the subtrees of same height.
+        The left subtree is full, the tree is built by O(log n) memory.
+        '''
+        height: int = 0
+        while len(self._stack) >= 1 and self._stack[-1][0] == height:
+            digests = self._node(self._stack.pop()[1], digests)
+            height += 1
+        self._stack.append((height, digests))
+        return
+
+    @staticmethod
+    def _preadinto(fd: int, view: memoryview, offset: int) -> int:
+        '''
+          Read into the buffer by os.preadv(), thread safe.
+        os.pread() and copy if os.preadv() is not available(Python 3.6, macOS 10).
+        '''
+        if hasattr(os, 'preadv'):
+            return os.preadv(fd, [view], offset)
+        data: bytes = os.pread(fd, len(view), offset)
+        view[:len(data)] = data
+        return len(data)
+
+    def _pread(self, fp, view: memoryview, length: int, offset: int, retry: int = 2,
+               interval: float = 1.0, maxinterval: float = 120.0, progress=None, throttle=None):
+        '''
+          Generator, read the chunk by blocks into view, thread safe.
+        The yielded block is valid until next block, the chunk is resumed from the
+        read bytes on retry. The throttle and the progress are charged by blocks.
+        '''
+        fd: int = fp.fileno()
+        done: int = 0
+        for i in LPYknife.backoff_iter(retry=retry, interval=interval, maxinterval=maxinterval):
+            try:
+                while done < length:
+                    size: int = min(len(view), length - done)
+                    if throttle != None:
+                        throttle.acquire(size)
+                    n: int = self._preadinto(fd, view[:size], offset + done)
+                    if n == 0:
+                        raise EOFError('The file is shorter than stat.')
+                    yield view[:n]
+                    if self.scrub:
+                        Main_common._fadvise(fp, offset + done, n, 'DONTNEED')
+                    if progress != None:
+                        progress.update(n)
+                    done += n
+                return
+            except OSError:
+                if i >= retry:
+                    raise
+        return
+
+    def calc(self, fp, filesize: int, retry: int = 2, interval: float = 1.0,
+             maxinterval: float = 120.0, progress=None, throttle=None) -> bool:
+        '''
+          Calculate the tree digest of the file.
+        Return Value: True: Success, False: read error.
+        '''
+        fd: int = fp.fileno()
+        sparse: bool = Main_common._issparse(fp, filesize)
+        zeroleafs: dict = dict()  # length: leaf digests of the hole chunk.
+        blocksize: int = min(self.blocksize, self.chunksize)
+
+        def leaf(offset: int) -> list:
+            length: int = min(self.chunksize, filesize - offset)
+            if sparse and Main_common._nextdata(fd, offset, filesize)[0] >= offset + length:
+                if length not in zeroleafs:  # race is harmless, same value.
+                    zeros: memoryview = Main_common.bufferpool.zeros(blocksize)
+                    zeroleafs[length] = self._leaf(
+                        zeros[:min(blocksize, length - pos)] for pos in range(0, length, blocksize))
+                if progress != None:
+                    progress.update(length)
+                return zeroleafs[length]
+            buf: bytearray = Main_common.bufferpool.acquire(blocksize)
+            try:
+                blocks = self._pread(fp, memoryview(buf)[:blocksize], length, offset,
+                                     retry=retry, interval=interval, maxinterval=maxinterval,
+                                     progress=progress, throttle=throttle)
+                return self._leaf(blocks)
+            finally:
+                Main_common.bufferpool.release(buf)
+        offsets = range(0, max(filesize, 1), self.chunksize)  # empty file is one chunk.
+        try:
+            if len(offsets) == 1:
+                self._push(leaf(0))
+            else:
+                pool = Hashjobpool(self.jobs, executor=self.executor())
+                for offset, digests in pool.imap(leaf, offsets):
+                    self._push(digests)
+        except (OSError, EOFError):
+            return False
+        root = self._stack.pop()[1]
+        while len(self._stack) >= 1:
+            root = self._node(self._stack.pop()[1], root)
+        self._root = root
+        return True
+
+    def hexdigests(self) -> list:
+        return [digest.hex() for digest in self._root]
+
+
+class _Calcfpath_namedtuple(typing.NamedTuple):
+    fpath: str = ''
+    fstat: typing.Any = None  # os.stat_result, None if not stat yet.
+    inodedevid: tuple = (0, 0)  # (inode, devid)
+    nlink: int = 1  # number of hard links.
+    linked: bool = False  # hard link of the file already yielded.
+
+
+class Hardlinkdigest(object):
+    '''
+      Digests of hard linked files, keyed by (inode, devid).
+    The file is calculated at once, the other hard links reuse the digests.
+    Only the files of nlink >= 2 are kept, until nlink paths are resolved.
+    '''
+
+    def __init__(self):
+        self._digests: dict = dict()  # inodedevid: [hashdgsts, number of links not resolved]
+        self._waiting: dict = dict()  # inodedevid: linked calcfpaths of list.
+        return
+
+    def resolve(self, calcfpath: _Calcfpath_namedtuple, hashdgsts: list) -> list:
+        '''
+          Resolve the digests of hard links.
+        calcfpath.linked:
+            False: calculated file, hashdgsts is the result.
+            True : hard link, hashdgsts is ignored.
+        Return Value: (calcfpath, hashdgsts) of list, ready to output.
+            Empty list if the linked file is not calculated yet(completion order).
+        '''
+        key: tuple = calcfpath.inodedevid
+        if calcfpath.linked != True:
+            if calcfpath.nlink < 2:
+                return [(calcfpath, hashdgsts)]
+            waiting: list = self._waiting.pop(key, [])
+            if calcfpath.nlink - 1 - len(waiting) >= 1:
+                self._digests[key] = [hashdgsts, calcfpath.nlink - 1 - len(waiting)]
+            return [(calcfpath, hashdgsts)] +\
+                [(linkfpath, hashdgsts) for linkfpath in waiting]
+        if key in self._digests:
+            hashdgsts = self._digests[key][0]
+            self._digests[key][1] -= 1
+            if self._digests[key][1] <= 0:
+                del self._digests[key]  # all hard links are resolved.
+            return [(calcfpath, hashdgsts)]
+        self._waiting.setdefault(key, []).append(calcfpath)
+        return []
+
+
+class Progressreport(object):
+    '''
+      Aggregate progress of all files and worker threads, printed to stderr.
+    The line is printed at most 4 times per second, not by each block.
+      e.g. Progress: 1204.5/5120.0 MB(23%), 12/40 files, 350.2 MB/s, ETA 0:00:11
+    The total is counted by the sizer thread ahead of the calculation,
+    it is printed with '+' and ETA is '-' until counted completely.
+    '''
+    interval: float = 0.25  # 4 Hz
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total: int = 0  # bytes of all files.
+        self.totalfiles: int = 0
+        self.done: int = 0  # bytes of completed and reading files.
+        self.donefiles: int = 0
+        self.counted: bool = False  # total is counted completely.
+        self._read: int = 0  # bytes read, not skipped by the cache.
+        self._start: float = time.monotonic()
+        self._next: float = self._start + self.interval
+        self._printed: bool = False
+        return
+
+    def start_sizer(self, sizes, skip: int = 0):
+        '''
+          Count the total on a daemon thread.
+        sizes: iterable of file sizes, e.g. Runcalcmode.iterator_sizes()
+          None is not counted, e.g. hard link.
+        skip : number of the items not counted, e.g. completed files of --resume.
+        '''
+        def sizer():
+            for size in itertools.islice(sizes, skip, None):
+                if size == None:
+                    continue
+                with self._lock:
+                    self.total += size
+                    self.totalfiles += 1
+            self.counted = True
+            return
+        thread = threading.Thread(target=sizer, daemon=True)
+        thread.start()
+        return
+
+    def update(self, nbytes: int):
+        '''
+          Add read bytes, called by each block.
+        '''
+        with self._lock:
+            self.done += nbytes
+            self._read += nbytes
+            self._print()
+        return
+
+    def add_file(self, skipped: int = 0):
+        '''
+          Count the completed file.
+        skipped: bytes not read, e.g. the digest cache hit.
+        '''
+        with self._lock:
+            self.donefiles += 1
+            self.done += skipped
+            self._print()
+        return
+
+    def _print(self):
+        now: float = time.monotonic()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        mb: int = 1048576
+        rate: float = self._read / (now - self._start)
+        mes: str = 'Progress: {0:.1f} MB, {1} files'.format(
+            self.done / mb, self.donefiles)
+        if self.total >= 1:
+            mes = 'Progress: {0:.1f}/{1:.1f}{2} MB({3}%), {4}/{5}{2} files'.format(
+                self.done / mb, self.total / mb, '' if self.counted else '+',
+                min(self.done * 100 // self.total, 100), self.donefiles, self.totalfiles)
+        mes += ', {0:.1f} MB/s'.format(rate / mb)
+        if self.counted and self.total >= 1 and rate > 0:
+            eta: int = int(max(self.total - self.done, 0) / rate)
+            mes += ', ETA {0}:{1:02d}:{2:02d}'.format(
+                eta // 3600, eta // 60 % 60, eta % 60)
+        elif self.total >= 1:
+            mes += ', ETA -'
+        print('\x1b[K' + mes + '\r', end='', file=sys.stderr, flush=True)
+        self._printed = True
+        return
+
+    def finish(self):
+        '''
+          Clear the progress line.
+        '''
+        with self._lock:
+            if self._printed:
+                print('\x1b[K', end='', file=sys.stderr, flush=True)
+                self._printed = False
+            self._next = float('inf')
+        return
+
+
+class Prefetcher(object):
+    '''
+      Prefetch the upcoming files of the pipeline, --prefetch N.
+    The files are advised by posix_fadvise(WILLNEED) when they are N items ahead of
+    the calculation, the kernel reads them while the current file is hashed.
+    The head of the file(advise_bytes) is advised, the rest is read by the kernel readahead.
+    '''
+    advise_bytes: int = 8388608  # 8M
+
+    def __init__(self, distance: int):
+        self.distance: int = distance  # look-ahead distance, number of files.
+        self.advised: int = 0  # number of the advised files.
+        self.advisedbytes: int = 0
+        self.failed: int = 0  # failure to open or advise(e.g. removed).
+        return
+
+    @staticmethod
+    def available() -> bool:
+        return True if hasattr(os, 'posix_fadvise') else False
+
+    def advise(self, fpath: str):
+        try:
+            fd: int = os.open(fpath, os.O_RDONLY)
+        except OSError:
+            self.failed += 1
+            return
+        try:
+            size: int = min(os.fstat(fd).st_size, self.advise_bytes)
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+            self.advised += 1
+            self.advisedbytes += size
+        except OSError:
+            self.failed += 1
+        finally:
+            os.close(fd)
+        return
+
+    def iterator(self, items, fpathof):
+        '''
+          Yield the items by same order, the item is advised distance items before.
+        fpathof(function): file path of the item, None: not advised(e.g. hard link).
+        '''
+        window = collections.deque()
+        for item in items:
+            fpath = fpathof(item)
+            if fpath != None:
+                self.advise(fpath)
+            window.append(item)
+            if len(window) > self.distance:
+                yield window.popleft()
+        while len(window) >= 1:
+            yield window.popleft()
+        return
+
+    def print_stats(self):
+        mes: str = 'Prefetch: distance {0}, advised {1} files({2:.1f} MB), failed {3}.'.format(
+            self.distance, self.advised, self.advisedbytes / 1048576, self.failed)
+        print(mes, file=sys.stderr)
+        return
+
+
+class Iothrottle(object):
+    '''
+      Token bucket of the read bandwidth and IOPS, shared by all worker threads.
+    --bwlimit: bytes per second, --iops-limit: read requests per second.
+    The request is taken from the bucket before the read, the thread sleeps
+    while the bucket is negative(debt), the average rate does not exceed the limit.
+    The bucket holds the tokens of one second at most(burst).
+    '''
+
+    def __init__(self, bwlimit: int = 0, iopslimit: int = 0):
+        self.bwlimit: int = bwlimit  # 0: unlimited.
+        self.iopslimit: int = iopslimit  # 0: unlimited.
+        self._bytes: float = float(bwlimit)
+        self._ios: float = float(iopslimit)
+        self._last: float = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited: float = 0.0  # seconds slept by all threads.
+        self.requests: int = 0
+        return
+
+    @staticmethod
+    def setidle() -> bool:
+        '''
+          Set the I/O scheduling class of the process to idle by ioprio_set(2), Linux.
+        The threads created after the call inherit the class.
+        Return Value: False if not supported.
+        '''
+        syscalls: dict = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30,
+                          'armv7l': 314, 'ppc64le': 273, 'riscv64': 30, 's390x': 282}
+        ioprio_who_process: int = 1
+        ioprio_class_idle: int = 3
+        if sys.platform.startswith('linux') != True or os.uname().machine not in syscalls:
+            return False
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            ret = libc.syscall(syscalls[os.uname().machine], ioprio_who_process, 0,
+                               ioprio_class_idle << 13)
+        except (OSError, AttributeError):
+            return False
+        return True if ret == 0 else False
+
+    def acquire(self, nbytes: int):
+        '''
+          Take the tokens of one read request of nbytes, sleep if the bucket is in debt.
+        '''
+        wait: float = 0.0
+        with self._lock:
+            now: float = time.monotonic()
+            elapsed: float = now - self._last
+            self._last = now
+            self.requests += 1
+            if self.bwlimit >= 1:
+                self._bytes = min(self._bytes + elapsed * self.bwlimit, self.bwlimit)
+                self._bytes -= nbytes
+                wait = max(wait, -self._bytes / self.bwlimit)
+            if self.iopslimit >= 1:
+                self._ios = min(self._ios + elapsed * self.iopslimit, self.iopslimit)
+                self._ios -= 1
+                wait = max(wait, -self._ios / self.iopslimit)
+            self.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return
+
+    def print_stats(self):
+        mes: str = 'Throttle: bwlimit {0}, iops-limit {1}, {2} requests, waited {3:.1f} seconds.'
+        mes = mes.format(self.bwlimit, self.iopslimit, self.requests, self.waited)
+        print(mes, file=sys.stderr)
+        return
+
+
+class Checkpoint(object):
+    '''
+      Checkpoint file of long calc and check runs(--checkpoint, --resume).
+    The number of completed files(input order), the last file path and the counters
+    are written atomically every 1000 files or 10 seconds, and on SIGINT, SIGTERM.
+    The output is flushed before writing, the checkpoint never counts unwritten rows.
+    The signal is not raised in the handler, the run is stopped between the files
+    by checkinterrupt(), the row and complete() of a file are not split.
+    offsets: size of --output-prefix files, truncated to it on resume.
+    '''
+    every_files: int = 1000
+    every_seconds: float = 10.0
+
+    def __init__(self, fpath: str, source: dict, fps: list):
+        self.fpath: str = fpath
+        self.source: dict = source  # options of the run, must match on resume.
+        self.fps: list = fps  # output file pointers, flushed before writing.
+        self.done: int = 0  # number of completed files.
+        self.lastfpath: str = ''
+        self.counters: dict = dict()
+        self.offsets: dict = dict()  # fname: size of the output file.
+        self.signum: int = 0
+        self._saved_done: int = 0
+        self._saved_time: float = time.monotonic()
+        return
+
+    def load(self):
+        '''
+          Load the checkpoint file for --resume.
+        Start from the beginning if the file not exists.
+        '''
+        errmes: str
+        state: dict
+        try:
+            with open(self.fpath, 'rt') as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            errmes = 'Error: Invalid checkpoint file. [{0}] {1}'.format(
+                self.fpath, e)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        if state.get('source') != self.source:
+            errmes = 'Error: The checkpoint file is not for the arguments. [{0}]'
+            errmes = errmes.format(self.fpath)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        self.done = state.get('done', 0)
+        self.lastfpath = state.get('lastfpath', '')
+        self.counters = state.get('counters', dict())
+        self.offsets = state.get('offsets', dict())
+        self._saved_done = self.done
+        return
+
+    def iterator_skip(self, items, fpathof, onskip=None):
+        '''
+          Skip the completed items of the checkpoint.
+        fpathof: function, item -> file path.
+        onskip : function called with the skipped item, or None.
+        The input is changed if the file path of last completed item is different.
+        '''
+        errmes: str
+        index: int = 0
+        for item in items:
+            index += 1
+            if index > self.done:
+                yield item
+                continue
+            if index == self.done and fpathof(item) != self.lastfpath:
+                errmes = 'Error: The input is changed from the checkpoint. [{0}]'
+                errmes = errmes.format(fpathof(item))
+                print(errmes, file=sys.stderr)
+                exit(1)
+            if onskip != None:
+                onskip(item)
+        if index < self.done:
+            errmes = 'Error: The input is changed from the checkpoint, {0} files. [{1}]'
+            errmes = errmes.format(index, self.fpath)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        return
+
+    def complete(self, fpath: str, **counters):
+        '''
+          Count the output file and its counters, write the checkpoint if interval.
+        '''
+        self.done += 1
+        self.lastfpath = fpath
+        self.counters.update(counters)
+        if self.done - self._saved_done >= self.every_files or\
+           time.monotonic() - self._saved_time >= self.every_seconds:
+            self.save()
+        return
+
+    def save(self):
+        '''
+          Flush the outputs and write the checkpoint file atomically.
+        '''
+        errmes: str
+        tmppath: str = '{0}.{1}.tmp'.format(self.fpath, os.getpid())
+        for fp in self.fps:
+            fp.flush()
+            if fp != sys.stdout:
+                self.offsets[fp.name] = fp.tell()
+        state: dict = {'source': self.source, 'done': self.done,
+                       'lastfpath': self.lastfpath, 'counters': self.counters,
+                       'offsets': self.offsets}
+        try:
+            with open(tmppath, 'wt') as fp:
+                json.dump(state, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(tmppath, self.fpath)
+        except OSError as e:
+            errmes = 'Warning: Can not write the checkpoint file. [{0}] {1}'.format(
+                self.fpath, e)
+            print(errmes, file=sys.stderr)
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+        self._saved_done = self.done
+        self._saved_time = time.monotonic()
+        return
+
+    def _interrupted(self, signum: int, frame):
+        self.signum = signum  # stopped by checkinterrupt().
+        return
+
+    def checkinterrupt(self):
+        '''
+          Raise KeyboardInterrupt if SIGINT, SIGTERM is received, called between the files.
+        '''
+        if self.signum != 0:
+            raise KeyboardInterrupt
+        return
+
+    def begin(self):
+        '''
+          Install SIGINT, SIGTERM handler, the run is stopped by checkinterrupt().
+        The current files are completed before stop.
+        '''
+        signal.signal(signal.SIGINT, self._interrupted)
+        signal.signal(signal.SIGTERM, self._interrupted)
+        return
+
+    def finish(self, completed: bool):
+        '''
+          Remove the checkpoint file if completed, else write it.
+        Exit by 128 + signal number if interrupted.
+        '''
+        errmes: str
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if completed:
+            if os.path.exists(self.fpath):
+                os.remove(self.fpath)
+            return
+        self.save()
+        if self.signum != 0:
+            errmes = 'Interrupted, {0} files completed. Resume by --resume option. [{1}]'
+            errmes = errmes.format(self.done, self.fpath)
+            print(errmes, file=sys.stderr)
+            exit(128 + self.signum)
+        return
+
+
+class Runcheckmode(object):
+    @staticmethod
+    def getrowinfo_hash(row: str, basedir: str) -> _Hashinfo_namedtuple:
+        normrow: str = row.strip()
+        if normrow.startswith('#'):
+            return None
+        style = Hashrowstringstyle()
+        style.analyze(row)
+        if LPYknife.allfalse([style.guess.opensslstyle, style.guess.BSDstyle, style.guess.GNUstyle]):
+            return None
+        rowinfo = _Hashinfo_namedtuple()
+        if style.guess.opensslstyle:
+            rowinfo = rowinfo._makeinfo_opensslstyle(row, basedir)
+        if style.guess.BSDstyle:
+            rowinfo = rowinfo._makeinfo_BSDstyle(row, basedir)
+        if style.guess.GNUstyle:
+            rowinfo = rowinfo._makeinfo_GNUstyle(row, basedir)
+        if len(rowinfo.hashdg) == 0:
+            return None
+        return rowinfo
+
+    @staticmethod
+    def calc(rowinfo: _Hashinfo_namedtuple, algo: str = '',
+             normargs: Args_shacksum = None) -> _CalcHashInfo_namedtuple:
+        kind: str
+        matched: bool
+        kind = algo if algo != '' else rowinfo.algo
+        if normargs != None:
+            flag, errmes, hashdg = Main_common.calc_fhashdgst_byargs(
+                rowinfo.fpath_abs, kind, normargs)
+        else:
+            flag, errmes, hashdg = Main_common.calc_fhashdgst(
+                rowinfo.fpath_abs, kind)
+        if flag != True:
+            calculated = _CalcHashInfo_namedtuple(
+                '', rowinfo.fpath, kind, rowinfo.fpath_abs, errmes, False)
+            return calculated  # Error
+        matched = True if rowinfo.hashdg == hashdg else False
+        calculated = _CalcHashInfo_namedtuple(
+            hashdg, rowinfo.fpath, kind, rowinfo.fpath_abs, '', matched)
+        return calculated
+
+    @staticmethod
+    def print_resultcalc(calchash: _CalcHashInfo_namedtuple, rowinfo, fp, printabs: bool = False, printwithabs: bool = False):
+        mes: str
+        errmes: str
+        fpath: str
+        try:
+            fp.flush()
+        except:
+            errmes = 'Error: fp is not file pointer, print_resultcalc()'
+            raise TypeError(errmes)
+        fpath = calchash.fpath_abs if printabs == True else calchash.fpath
+        if calchash.matched:
+            mes = 'OK[{0}]: {1}'.format(calchash.algo, fpath)
+            mes = unicodedata.normalize('NFD', mes)
+            print(mes, file=fp)
+        else:
+            mes = 'NG[{0}]: {1}\n  hashdg(checkfile): {2}\n  hashdg(calc)     : {3}\n  Error: {4}'
+            mes = mes.format(calchash.algo, fpath, rowinfo.hashdg,
+                             calchash.hashdg, calchash.errmes)
+            mes = unicodedata.normalize('NFD', mes)
+            print(mes, file=fp)
+            ''' mes = 'NG[{0}]: {1}'.format(calchash.algo, fpath);
+            mes = unicodedata.normalize('NFD', mes);
+            print(mes, file=fp);
+            mes = '  hashdg(checkfile): {0}\n  hashdg(calc)     : {1}'.format(rowinfo.hashdg, calchash.hashdg)
+            mes = unicodedata.normalize('NFD', mes);
+            print(mes, file=fp);
+            mes = '  Error: {0}'.format(calchash.errmes)
+            print(mes, file=fp); '''
+        if printwithabs:
+            mes = '  absolutepath: {0}'.format(calchash.fpath_abs)
+            mes = unicodedata.normalize('NFD', mes)
+            print(mes, file=fp)
+        return
+
+    @staticmethod
+    def iterator_checkfile(checkfile: str):
+        '''
+          Yield rowinfo parsed from checkfile, one row at a time.
+        The checkfile is not loaded at once, memory is constant.
+        '''
+        checkdirname: str = os.path.dirname(checkfile)
+        rowinfo: _Hashinfo_namedtuple
+        with open(checkfile, 'rt') as fp:
+            for row in fp:
+                rowinfo = Runcheckmode.getrowinfo_hash(row, checkdirname)
+                if rowinfo != None:
+                    yield rowinfo
+        return
+
+    @staticmethod
+    def iterator_sizes(checkfile: str):
+        '''
+          Yield file size of the rows, the total of Progressreport.
+        None: not stat.
+        '''
+        for rowinfo in Runcheckmode.iterator_checkfile(checkfile):
+            try:
+                yield os.stat(rowinfo.fpath_abs).st_size
+            except OSError:
+                yield None
+        return
+
+    @staticmethod
+    def iterator_rowinfo(rowinfos, normargs: Args_shacksum):
+        '''
+          Yield (rowinfo, algo) to verify.
+        algo(str): '' on opensslstyle, BSDstyle. --algorythm value on GNUstyle.
+        '''
+        errmes: str
+        for rowinfo in rowinfos:
+            if rowinfo.stylename in ['opensslstyle', 'BSDstyle']:
+                yield rowinfo, ''
+            elif rowinfo.stylename == 'GNUstyle':
+                if normargs.algorythm == '':
+                    errmes = 'Error: Not found --algorythm option.'
+                    print(errmes, file=sys.stderr)
+                    exit(1)
+                yield rowinfo, normargs.algorythm
+        return
+
+    def run(self, normargs: Args_shacksum):
+        rowinfo: _Hashinfo_namedtuple
+        calchash: _CalcHashInfo_namedtuple
+        total: int = 0  # number of verified rows.
+        unmatched: int = 0  # number of NG rows.
+        completed: bool = False
+        checkpoint: Checkpoint = self.open_checkpoint(normargs)
+        progress: Progressreport = Main_common.progress
+        rowinfos = self.iterator_rowinfo(
+            self.iterator_checkfile(normargs.check), normargs)
+        if progress != None and normargs.progress:
+            progress.start_sizer(self.iterator_sizes(normargs.check),
+                                 skip=checkpoint.done if checkpoint != None else 0)
+        if checkpoint != None:
+            total = checkpoint.counters.get('total', 0)
+            unmatched = checkpoint.counters.get('unmatched', 0)
+            rowinfos = checkpoint.iterator_skip(
+                rowinfos, lambda rowalgo: rowalgo[0].fpath)
+        if Main_common.prefetcher != None:
+            rowinfos = Main_common.prefetcher.iterator(
+                rowinfos, lambda rowalgo: rowalgo[0].fpath_abs)
+        if normargs._jobs >= 2:
+            results = self.iterator_parallel(rowinfos, normargs)
+        else:
+            results = ((rowinfo, self.calc(rowinfo, algo=algo, normargs=normargs))
+                       for rowinfo, algo in rowinfos)
+        try:
+            for rowinfo, calchash in results:
+                self.print_resultcalc(
+                    calchash, rowinfo, sys.stdout, printabs=False, printwithabs=False)
+                total += 1
+                unmatched += 0 if calchash.matched else 1
+                if checkpoint != None:
+                    checkpoint.complete(rowinfo.fpath, total=total,
+                                        unmatched=unmatched)
+                    checkpoint.checkinterrupt()
+            completed = True
+        except KeyboardInterrupt:
+            if checkpoint == None:
+                raise
+        finally:
+            if progress != None:
+                progress.finish()
+            if checkpoint != None:
+                checkpoint.finish(completed)
+        if total == 0:
+            exit(1)
+        elif unmatched == 0:
+            exit(0)
+        else:
+            exit(1)
+
+    @staticmethod
+    def open_checkpoint(normargs: Args_shacksum) -> Checkpoint:
+        '''
+          Checkpoint of --checkpoint option, None if not given.
+        The checkfile is identified by the path, size and mtime.
+        '''
+        if normargs.checkpoint == '':
+            return None
+        fstat = os.stat(normargs.check)
+        source: dict = {'mode': 'check', 'check': normargs.check,
+                        'size': fstat.st_size, 'mtime_ns': fstat.st_mtime_ns,
+                        'algorythm': normargs.algorythm, 'style': normargs.style}
+        checkpoint = Checkpoint(normargs.checkpoint, source, [sys.stdout])
+        if normargs.resume:
+            checkpoint.load()
+        checkpoint.begin()
+        return checkpoint
+
+    def iterator_parallel(self, rowinfos, normargs: Args_shacksum):
+        '''
+          Verify the rows on --jobs worker threads.
+        Yield (rowinfo, calchash) by row order, or completion order if --unordered.
+        '''
+        pool = Hashjobpool(normargs._jobs)
+        ordered: bool = False if normargs.unordered else True
+
+        def calc(rowalgo: tuple) -> _CalcHashInfo_namedtuple:
+            rowinfo, algo = rowalgo
+            return self.calc(rowinfo, algo=algo, normargs=normargs)
+
+        lastdir: list = ['', None]  # dirpath, st_dev of the last row, the rows are adjacent.
+
+        def devid(rowalgo: tuple) -> int:
+            dirpath: str = os.path.dirname(rowalgo[0].fpath_abs)
+            if dirpath != lastdir[0]:
+                try:
+                    lastdir[1] = os.stat(dirpath).st_dev
+                except OSError:
+                    lastdir[1] = None  # not found, not read.
+                lastdir[0] = dirpath
+            return lastdir[1]
+        for rowalgo, calchash in pool.imap(calc, rowinfos, ordered=ordered,
+                                           keyof=devid, perkey=normargs._device_jobs):
+            yield rowalgo[0], calchash
+        return
+
+
+class Runcalcmode(object):
     if sys.version_info.major == 3 and sys.version_info.minor < 9:
         styles = Const_SHA.styles
         algorithms = Const_SHA.algorithms
@@ -798,47 +2647,262 @@ class Runcalcmode(object):
         algorithms: typing.Final[tuple[str]] = Const_SHA.algorithms
 
     @staticmethod
-    def iterator_args(normargs: Args_shacksum):
-        f: str
-        fpath: str
+    def _scandir(dirpath: str) -> tuple:
+        '''
+          Scan the directory by os.scandir(), stat the entries.
+        Symbolic links are not followed.
+        Return Value: (files, subdirs)
+          files(list)  : _Calcfpath_namedtuple of regular files by name order.
+          subdirs(list): (dirpath, stat) of directories by name order.
+          None         : Failure to read the directory.
+        '''
+        entries: list
+        files: list = list()
+        subdirs: list = list()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            return None
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(
+                        (entry.path, entry.stat(follow_symlinks=False)))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(_Calcfpath_namedtuple(
+                        entry.path, entry.stat(follow_symlinks=False)))
+            except OSError:
+                continue  # removed while walking.
+        return files, subdirs
+
+    @staticmethod
+    def _walk_warning(dirpath: str):
+        errmes: str = 'Warning: Can not read the directory. [{0}]'.format(
+            dirpath)
+        print(errmes, file=sys.stderr)
+        return
+
+    @staticmethod
+    def iterator_walk(topdir: str, visited: set, quiet: bool = False):
+        '''
+          Yield _Calcfpath_namedtuple of regular files under topdir recursively.
+        The stat of os.scandir() DirEntry is cached, calc_fhashdgsts() reuse it.
+        Symbolic links are not followed.
+        visited(set): (st_dev, st_ino) of visited directories, protect from loop.
+        quiet(bool): no warning of unreadable directories.
+        '''
+        dirpath: str
+        try:
+            dstat = os.stat(topdir)
+        except OSError:
+            return
+        stack: list = [(topdir, dstat)]
+        while len(stack) >= 1:
+            dirpath, dstat = stack.pop()
+            if (dstat.st_dev, dstat.st_ino) in visited:
+                continue  # directory loop, or already walked.
+            visited.add((dstat.st_dev, dstat.st_ino))
+            scanned = Runcalcmode._scandir(dirpath)
+            if scanned == None:
+                if quiet != True:
+                    Runcalcmode._walk_warning(dirpath)
+                continue
+            files, subdirs = scanned
+            for calcfpath in files:
+                yield calcfpath
+            stack.extend(reversed(subdirs))  # walk by name order.
+        return
+
+    @staticmethod
+    def iterator_walk_parallel(topdir: str, visited: set, walkers: int, ordered: bool = True):
+        '''
+          iterator_walk() on walkers threads, for wide trees and network filesystems.
+        The directories are scanned on the threads, at most walkers * 2 in flight.
+        ordered(bool):
+            True : same order as iterator_walk(), next directories are scanned ahead.
+            False: yield by completion order of scanning.
+        '''
+        dirpath: str
+        window: int = walkers * 2
+        try:
+            dstat = os.stat(topdir)
+        except OSError:
+            return
+        if (dstat.st_dev, dstat.st_ino) in visited:
+            return
+        visited.add((dstat.st_dev, dstat.st_ino))
+
+        def newdirs(subdirs: list) -> list:
+            dirpaths: list = list()
+            for dirpath, dstat in subdirs:
+                if (dstat.st_dev, dstat.st_ino) in visited:
+                    continue  # directory loop, or already walked.
+                visited.add((dstat.st_dev, dstat.st_ino))
+                dirpaths.append(dirpath)
+            return dirpaths
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=walkers)
+        inflight: dict = dict()  # future: dirpath
+        try:
+            if ordered:
+                stack: list = [[topdir, None]]  # [dirpath, future]
+                while len(stack) >= 1:
+                    for node in reversed(stack):  # scan ahead from top.
+                        if len(inflight) >= window:
+                            break
+                        if node[1] == None:
+                            node[1] = executor.submit(
+                                Runcalcmode._scandir, node[0])
+                            inflight[node[1]] = node[0]
+                    dirpath, fut = stack.pop()
+                    if fut == None:
+                        scanned = Runcalcmode._scandir(dirpath)
+                    else:
+                        scanned = fut.result()
+                        del inflight[fut]
+                    if scanned == None:
+                        Runcalcmode._walk_warning(dirpath)
+                        continue
+                    files, subdirs = scanned
+                    for calcfpath in files:
+                        yield calcfpath
+                    stack.extend([[dirpath, None]
+                                 for dirpath in reversed(newdirs(subdirs))])
+                return
+            pending = collections.deque([topdir])
+            while len(pending) >= 1 or len(inflight) >= 1:
+                while len(pending) >= 1 and len(inflight) < window:
+                    dirpath = pending.popleft()
+                    inflight[executor.submit(
+                        Runcalcmode._scandir, dirpath)] = dirpath
+                done, notdone = concurrent.futures.wait(
+                    list(inflight.keys()), return_when=concurrent.futures.FIRST_COMPLETED)
+                for fut in done:
+                    dirpath = inflight.pop(fut)
+                    scanned = fut.result()
+                    if scanned == None:
+                        Runcalcmode._walk_warning(dirpath)
+                        continue
+                    files, subdirs = scanned
+                    for calcfpath in files:
+                        yield calcfpath
+                    pending.extend(newdirs(subdirs))
+        finally:
+            for fut in inflight.keys():
+                fut.cancel()
+            executor.shutdown(wait=True)
+        return
+
+    @staticmethod
+    def iterator_dedup(calcfpaths):
+        '''
+          Deduplicate _Calcfpath_namedtuple by inode and devid.
+        The same file is yielded at once.
+        The other hard links(different fpath) are yielded with linked=True,
+        they are not calculated and reuse the digests(Hardlinkdigest).
+        The hard linked file is forgotten when st_nlink paths are yielded.
+        '''
         inodedevid: tuple
-        dedup_list: list = list()
-        for f in normargs.calcfiles:
-            fpath = f
-            inodedevid = LPYknife.get_fileinodev(fpath)
+        fpath: str
+        dedup_set: set = set()  # (inode, devid) of yielded files.
+        linkpaths: dict = dict()  # (inode, devid): fpaths(set) of hard linked files.
+        for calcfpath in calcfpaths:
+            fstat = calcfpath.fstat
+            if fstat == None:
+                try:
+                    fstat = os.stat(calcfpath.fpath)
+                except OSError:
+                    continue  # Not read inode and devid
+            inodedevid = (fstat.st_ino, fstat.st_dev)
             if inodedevid[0] == 0 or inodedevid[1] == 0:
                 continue  # Not read inode and devid
-            if inodedevid in dedup_list:
+            fpath = os.path.normpath(calcfpath.fpath)
+            if inodedevid in dedup_set:
+                if fstat.st_nlink < 2 or fpath in linkpaths.get(inodedevid, ()):
+                    continue  # same file, not hard link.
+                linkpaths[inodedevid].add(fpath)
+                if len(linkpaths[inodedevid]) >= fstat.st_nlink:
+                    del linkpaths[inodedevid]  # all hard links are yielded.
+                    dedup_set.discard(inodedevid)
+                yield calcfpath._replace(inodedevid=inodedevid, nlink=fstat.st_nlink, linked=True)
                 continue
+            # append inode, devid for deduplication
+            dedup_set.add(inodedevid)
+            if fstat.st_nlink >= 2:
+                linkpaths[inodedevid] = {fpath}
+            yield calcfpath._replace(inodedevid=inodedevid, nlink=fstat.st_nlink)
+        return
+
+    @staticmethod
+    def iterator_fpaths(fpaths, normargs: Args_shacksum, quiet: bool = False):
+        '''
+          Yield _Calcfpath_namedtuple of the fpaths, not deduplicated.
+        The directories are walked if --recursive.
+        quiet(bool): walk on the thread, no warning(e.g. iterator_sizes()).
+        '''
+        fpath: str
+        visited: set = set()
+        for fpath in fpaths:
             if os.path.isfile(fpath):
-                # append inode, devid for deduplication
-                dedup_list.append(inodedevid)
-                yield fpath
+                yield _Calcfpath_namedtuple(fpath, None)
+            elif normargs.recursive and os.path.isdir(fpath):
+                if quiet:
+                    walked = Runcalcmode.iterator_walk(fpath, visited, quiet=True)
+                elif normargs._walk_jobs >= 2:
+                    ordered = False if normargs.unordered else True
+                    walked = Runcalcmode.iterator_walk_parallel(
+                        fpath, visited, normargs._walk_jobs, ordered=ordered)
+                else:
+                    walked = Runcalcmode.iterator_walk(fpath, visited)
+                for calcfpath in walked:
+                    yield calcfpath
+        return
+
+    @staticmethod
+    def iterator_args(normargs: Args_shacksum):
+        fpaths = iter(normargs.calcfiles)
+        return Runcalcmode.iterator_dedup(Runcalcmode.iterator_fpaths(fpaths, normargs))
 
     @staticmethod
     def iterator_stdin(normargs: Args_shacksum):
-        f: str
-        fpath: str
-        inodedevid: tuple
-        dedup_list: list = list()
-        for f in sys.stdin:
-            fpath = f.rstrip('\n')
-            inodedevid = LPYknife.get_fileinodev(fpath)
-            if inodedevid[0] == 0 or inodedevid[1] == 0:
-                continue  # Not read inode and devid
-            if inodedevid in dedup_list:
+        fpaths = (f.rstrip('\n') for f in sys.stdin)
+        return Runcalcmode.iterator_dedup(Runcalcmode.iterator_fpaths(fpaths, normargs))
+
+    @staticmethod
+    def iterator_sizes(normargs: Args_shacksum):
+        '''
+          Yield file size of iterator_args() items, the total of Progressreport.
+        None: hard link or not stat, not read.
+        '''
+        fpaths = iter(normargs.calcfiles)
+        for calcfpath in Runcalcmode.iterator_dedup(
+                Runcalcmode.iterator_fpaths(fpaths, normargs, quiet=True)):
+            if calcfpath.linked:
+                yield None
                 continue
-            if os.path.isfile(fpath):
-                # append inode, devid for deduplication
-                dedup_list.append(inodedevid)
-                yield fpath
+            try:
+                fstat = calcfpath.fstat if calcfpath.fstat != None else os.stat(
+                    calcfpath.fpath)
+            except OSError:
+                yield None
+                continue
+            yield fstat.st_size
+        return
 
-    def print_hash(self, fpath: str, hashdg: str, algo: str, style: str, fp, absolute: bool = False):
+    def print_hash(self, fpath: str, hashdg: str, algo: str, style: str, fp, absolute: bool = False,
+                   relto: str = '', regular: bool = False):
+        '''
+          Print the row of the file.
+        relto(str): the fpath is written relative to the directory, e.g. the checkfile directory.
+            '': as is.
+        regular(bool): the fpath is regular file by the stat of the walker or the calculation,
+            not stat again. False: checked by os.path.isfile().
+        '''
         errmes: str
         mes: str
         ptn: str
         f: str
-        if algo not in self.algorithms:
+        if Const_SHA.isalgorithm(algo) != True:
             errmes = 'Error: Unknown algorithm. [{0}]'.format(algo)
             print(errmes, file=sys.stderr)
             exit(1)
@@ -852,12 +2916,17 @@ class Runcalcmode(object):
             errmes = 'Error: RuntimeError, Empty Hash Digest.'
             print(errmes, file=sys.stderr)
             exit(1)
-        if os.path.isfile(fpath) != True:
+        if regular != True and os.path.isfile(fpath) != True:
             errmes = 'Error: RuntimeError, Not regular file. [{0}]'.format(
                 fpath)
             print(errmes, file=sys.stderr)
             exit(1)
         f = os.path.abspath(fpath) if absolute == True else fpath
+        if relto != '' and absolute != True:
+            try:
+                f = os.path.relpath(os.path.abspath(fpath), relto)
+            except ValueError:  # e.g. other drive on Windows.
+                f = os.path.abspath(fpath)
         if style == 'OPENSSL':
             mes = '{0}({1})= {2}'.format(algo, f, hashdg)
         elif style == 'BSD':
@@ -869,26 +2938,342 @@ class Runcalcmode(object):
         print(mes, file=fp)
         return
 
+    @staticmethod
+    def open_outputs(normargs: Args_shacksum, offsets: dict = None) -> dict:
+        '''
+          Open output file pointer of each algorithm.
+        sys.stdout for all algorithms, or PREFIX.ALGORITHM if --output-prefix.
+          e.g. --output-prefix CHECKSUM: CHECKSUM.SHA2-256, CHECKSUM.SHA2-512-256
+        offsets: fname: size of --resume, the file is truncated to the size and appended.
+        '''
+        errmes: str
+        fname: str
+        fps: dict = dict()
+        for algo in normargs._algorythms:
+            if normargs.output_prefix == '':
+                fps[algo] = sys.stdout
+                continue
+            fname = '{0}.{1}'.format(normargs.output_prefix,
+                                     algo.replace('/', '-'))
+            try:
+                if offsets != None and fname in offsets:
+                    fps[algo] = open(fname, 'at')
+                    fps[algo].truncate(offsets[fname])
+                else:
+                    fps[algo] = open(fname, 'wt')
+            except OSError:
+                errmes = 'Error: Can not open the output file. [{0}]'.format(
+                    fname)
+                print(errmes, file=sys.stderr)
+                exit(1)
+        return fps
+
     def run(self, normargs: Args_shacksum):
         errmes: str
+        hashdgsts: list
         if normargs.stdin:
             iterator = self.iterator_stdin  # load fpaths by sys.stdin
         else:
             iterator = self.iterator_args  # load fpaths by arguments.
-        for f in iterator(normargs):
-            flag, errmes, hashdg = Main_common.calc_fhashdgst(
-                f, normargs.algorythm)
-            if flag != True:
+        completed: bool = False
+        calcfpaths = iterator(normargs)
+        checkpoint: Checkpoint = self.open_checkpoint(normargs)
+        if checkpoint != None:
+            calcfpaths = self.iterator_resume(calcfpaths, checkpoint)
+            fps: dict = self.open_outputs(normargs, offsets=checkpoint.offsets)
+            checkpoint.fps = list(set(fps.values()))
+        else:
+            fps: dict = self.open_outputs(normargs)
+        if Main_common.prefetcher != None:
+            calcfpaths = Main_common.prefetcher.iterator(
+                calcfpaths, lambda calcfpath: None if calcfpath.linked else calcfpath.fpath)
+        progress: Progressreport = Main_common.progress
+        if progress != None and normargs.progress and normargs.stdin != True:
+            progress.start_sizer(self.iterator_sizes(normargs),
+                                 skip=checkpoint.done if checkpoint != None else 0)
+        if normargs._jobs >= 2:
+            results = self.iterator_parallel(calcfpaths, normargs)
+        else:
+            results = ((f, self.calc(f, normargs)) for f in calcfpaths)
+        hardlinks = Hardlinkdigest()
+        try:
+            for f, result in results:
+                flag, errmes, hashdgsts = result
+                if flag != True:
+                    print(errmes, file=sys.stderr)
+                    exit(1)
+                for calcfpath, hashdgsts in hardlinks.resolve(f, hashdgsts):
+                    for algo, hashdg in zip(normargs._algorythms, hashdgsts):
+                        self.print_hash(calcfpath.fpath, hashdg, algo, normargs.style,
+                                        fps[algo], absolute=False, regular=True)
+                    if checkpoint != None:
+                        checkpoint.complete(calcfpath.fpath)
+                if checkpoint != None:
+                    checkpoint.checkinterrupt()
+            completed = True
+        except KeyboardInterrupt:
+            if checkpoint == None:
+                raise
+        finally:
+            if progress != None:
+                progress.finish()
+            if checkpoint != None:
+                checkpoint.finish(completed)
+            for fp in fps.values():
+                if fp != sys.stdout:
+                    fp.close()
+        return
+
+    @staticmethod
+    def open_checkpoint(normargs: Args_shacksum) -> Checkpoint:
+        '''
+          Checkpoint of --checkpoint option, None if not given.
+        The output file pointers are set after open_outputs().
+        '''
+        if normargs.checkpoint == '':
+            return None
+        source: dict = {'mode': 'calc', 'calcfiles': normargs.calcfiles,
+                        'stdin': normargs.stdin, 'recursive': normargs.recursive,
+                        'algorythms': normargs._algorythms, 'style': normargs.style,
+                        'output_prefix': normargs.output_prefix}
+        checkpoint = Checkpoint(normargs.checkpoint, source, [])
+        if normargs.resume:
+            checkpoint.load()
+        checkpoint.begin()
+        return checkpoint
+
+    @staticmethod
+    def iterator_resume(calcfpaths, checkpoint: Checkpoint):
+        '''
+          Skip the completed files of the checkpoint.
+        The hard link of skipped file is calculated again(first one after the checkpoint),
+        the digest of skipped file is not kept.
+        '''
+        skipped: set = set()  # inodedevid of skipped hard linked files.
+
+        def onskip(calcfpath: _Calcfpath_namedtuple):
+            if calcfpath.nlink >= 2:
+                skipped.add(calcfpath.inodedevid)
+            return
+        for calcfpath in checkpoint.iterator_skip(
+                calcfpaths, lambda calcfpath: calcfpath.fpath, onskip):
+            if calcfpath.linked and calcfpath.inodedevid in skipped:
+                skipped.discard(calcfpath.inodedevid)
+                calcfpath = calcfpath._replace(linked=False)
+            yield calcfpath
+        return
+
+    def iterator_parallel(self, fpaths, normargs: Args_shacksum):
+        '''
+          Calculate the files on --jobs worker threads.
+        Yield (calcfpath, result) by input order, or completion order if --unordered.
+        '''
+        pool = Hashjobpool(normargs._jobs)
+        ordered: bool = False if normargs.unordered else True
+
+        def calc(calcfpath: _Calcfpath_namedtuple) -> tuple:
+            return self.calc(calcfpath, normargs)
+
+        def devid(calcfpath: _Calcfpath_namedtuple) -> int:
+            return None if calcfpath.linked else calcfpath.inodedevid[1]
+        for f, result in pool.imap(calc, fpaths, ordered=ordered,
+                                   keyof=devid, perkey=normargs._device_jobs):
+            yield f, result
+        return
+
+    @staticmethod
+    def calc(calcfpath: _Calcfpath_namedtuple, normargs: Args_shacksum) -> tuple:
+        '''
+          Calculate the file, Not calculate hard link(calcfpath.linked).
+        Return Value: same as calc_fhashdgsts()
+        '''
+        if calcfpath.linked:
+            return True, '', []  # Hardlinkdigest resolve the digests.
+        return Main_common.calc_fhashdgsts_byargs(calcfpath.fpath, normargs._algorythms,
+                                                  normargs, fstat=calcfpath.fstat)
+
+
+class Runupdatemode(Runcalcmode):
+    '''
+      Update the checkfile by the files(--update option).
+    New files are calculated, the rows of deleted files are removed.
+    The files not changed after the checkfile was written reuse the row digest.
+    '''
+
+    def __init__(self):
+        self.rows: dict = collections.OrderedDict()  # fpath_abs: (rowinfo, row)
+        self.seen: set = set()  # fpath_abs of the files.
+        self.checkfile_mtime_ns: int = 0
+        self.start_mtime_ns: int = 0  # mtime of the new checkfile, start of the run.
+        self.checkdirname: str = ''
+        self.reused: int = 0
+        self.calculated: int = 0
+        self.tmppath: str = ''
+        self._lock = threading.Lock()
+        return
+
+    def iterator_exclude(self, calcfpaths, normargs: Args_shacksum):
+        '''
+          Exclude the checkfile and its temporary file from the files.
+        '''
+        for calcfpath in calcfpaths:
+            if os.path.abspath(calcfpath.fpath) in [normargs.update, self.tmppath]:
+                continue
+            yield calcfpath
+        return
+
+    def iterator_args(self, normargs: Args_shacksum):
+        return self.iterator_exclude(Runcalcmode.iterator_args(normargs), normargs)
+
+    def iterator_stdin(self, normargs: Args_shacksum):
+        return self.iterator_exclude(Runcalcmode.iterator_stdin(normargs), normargs)
+
+    def load_checkfile(self, normargs: Args_shacksum):
+        '''
+          Load the rows of the checkfile, decide algorithm and style.
+        '''
+        errmes: str
+        row: str
+        fpath_abs: str
+        stylenames: dict = {'opensslstyle': 'OPENSSL',
+                            'BSDstyle': 'BSD', 'GNUstyle': 'GNU'}
+        firstinfo: _Hashinfo_namedtuple = None
+        checkdirname: str = os.path.dirname(normargs.update)
+        self.checkdirname = checkdirname
+        if os.path.exists(normargs.update):
+            self.checkfile_mtime_ns = os.stat(normargs.update).st_mtime_ns
+            with open(normargs.update, 'rt') as fp:
+                for row in fp:
+                    rowinfo = Runcheckmode.getrowinfo_hash(row, checkdirname)
+                    if rowinfo == None:
+                        continue
+                    firstinfo = rowinfo if firstinfo == None else firstinfo
+                    fpath_abs = self.fpathkey(os.path.join(checkdirname, rowinfo.fpath))
+                    self.rows[fpath_abs] = (rowinfo, row.rstrip('\n'))
+        if normargs.algorythm == '':
+            if firstinfo != None and firstinfo.stylename == 'GNUstyle':
+                errmes = 'Error: Not found --algorythm option.'
                 print(errmes, file=sys.stderr)
                 exit(1)
-            self.print_hash(f, hashdg, normargs.algorythm,
-                            normargs.style, sys.stdout, absolute=False)
+            normargs.algorythm = firstinfo.algo if firstinfo != None else 'SHA2-256'
+        normargs._algorythms = [normargs.algorythm]
+        if normargs.style == '':
+            normargs.style = stylenames[firstinfo.stylename] if firstinfo != None else 'OPENSSL'
+        return
+
+    @staticmethod
+    def fpathkey(fpath: str) -> str:
+        '''
+          Key of self.rows and self.seen, absolute path.
+        The rows are relative to the checkfile directory, the files are relative to CWD.
+        '''
+        return os.path.normpath(os.path.abspath(fpath))
+
+    def print_hash(self, fpath: str, hashdg: str, algo: str, style: str, fp, absolute: bool = False,
+                   relto: str = '', regular: bool = False):
+        '''
+          Print the row relative to the checkfile directory, same as load_checkfile().
+        The checkfile is verified and updated from any CWD.
+        '''
+        Runcalcmode.print_hash(self, fpath, hashdg, algo, style, fp, absolute=False,
+                               relto=self.checkdirname, regular=regular)
+        return
+
+    def reusable(self, rowinfo: _Hashinfo_namedtuple, fstat: os.stat_result, algo: str) -> bool:
+        '''
+          The row digest is reusable,
+        if the algorithm is same and the file is not changed after the last --update started.
+        The mtime of the checkfile is the start of the last run, see run().
+        '''
+        rowalgo: str = rowinfo.algo
+        algo = Const_SHA.aliases.get(algo, algo)
+        if rowinfo.stylename == 'GNUstyle':
+            if algo not in rowinfo.algo_guess:
+                return False
+        elif Const_SHA.aliases.get(rowalgo, rowalgo) != algo:
+            return False
+        if fstat.st_mtime_ns >= self.checkfile_mtime_ns:
+            return False
+        if fstat.st_ctime_ns >= self.checkfile_mtime_ns:
+            return False
+        return True
+
+    def calc(self, calcfpath: _Calcfpath_namedtuple, normargs: Args_shacksum) -> tuple:
+        '''
+          Calculate the file, or reuse the row digest if not changed.
+        Return Value: same as calc_fhashdgsts()
+        '''
+        fpath_abs: str = self.fpathkey(calcfpath.fpath)
+        self.seen.add(fpath_abs)
+        if calcfpath.linked:
+            return True, '', []  # Hardlinkdigest resolve the digests.
+        rowinfo, row = self.rows.get(fpath_abs, (None, ''))
+        if rowinfo != None:
+            try:
+                fstat = calcfpath.fstat if calcfpath.fstat != None else os.stat(
+                    calcfpath.fpath)
+            except OSError:
+                fstat = None
+            if fstat != None and self.reusable(rowinfo, fstat, normargs.algorythm):
+                with self._lock:
+                    self.reused += 1
+                if Main_common.progress != None:
+                    Main_common.progress.add_file(skipped=fstat.st_size)
+                return True, '', [rowinfo.hashdg]
+        with self._lock:
+            self.calculated += 1
+        return Runcalcmode.calc(calcfpath, normargs)
+
+    def open_outputs(self, normargs: Args_shacksum, offsets: dict = None) -> dict:
+        errmes: str
+        try:
+            fp = open(self.tmppath, 'wt')
+            # same clock as the mtime of the files(filesystem), not time.time().
+            self.start_mtime_ns = os.fstat(fp.fileno()).st_mtime_ns
+        except OSError:
+            errmes = 'Error: Can not open the output file. [{0}]'.format(
+                self.tmppath)
+            print(errmes, file=sys.stderr)
+            exit(1)
+        return {normargs.algorythm: fp}
+
+    def run(self, normargs: Args_shacksum):
+        mes: str
+        removed: int = 0
+        self.tmppath = '{0}.{1}.tmp'.format(normargs.update, os.getpid())
+        self.load_checkfile(normargs)
+        try:
+            Runcalcmode.run(self, normargs)
+            with open(self.tmppath, 'at') as fp:
+                for fpath_abs, (rowinfo, row) in self.rows.items():
+                    if fpath_abs in self.seen or fpath_abs == normargs.update:
+                        continue
+                    if os.path.isfile(fpath_abs):
+                        print(row, file=fp)  # not walked, keep the row.
+                    else:
+                        removed += 1
+            # mtime is the start of the run, not the end.
+            # The file changed while the run is calculated again by the next --update.
+            os.utime(self.tmppath, ns=(self.start_mtime_ns, self.start_mtime_ns))
+            os.replace(self.tmppath, normargs.update)
+        finally:
+            if os.path.exists(self.tmppath):
+                os.remove(self.tmppath)
+        mes = 'Update: calculated {0}, reused {1}, removed {2}. [{3}]'.format(
+            self.calculated, self.reused, removed, normargs.update)
+        print(mes, file=sys.stderr)
         return
 
 
 class Main_common(object):
     ver = '0.0.1'
     date = '13 Jan 2026'
+    bufferpool = Hashbufferpool()  # read buffers for calc_fhashdgst()
+    digestcache = None  # Digestcache(--cache) or Xattrcache(--xattr-cache)
+    progress = None  # Progressreport, if stderr is TTY.
+    prefetcher = None  # Prefetcher(--prefetch)
+    throttle = None  # Iothrottle(--bwlimit, --iops-limit)
+    hashlibnames: dict = dict()  # kind: detected name of hashlib.new(), '' if not supported.
 
     @classmethod
     def show_version(cls):
@@ -910,12 +3295,22 @@ class Main_common(object):
                        '  Calculate SHA checksum and Verity checkfile.',
                        'Description',
                        '  -a, --algorythm: calculate with the algorithm.',
+                       '    The algorithms separated by comma are calculated by one read pass.',
+                       '      e.g. -a sha2-256,sha3-512',
                        '    MD5, SHA1, SHA2-224, SHA224, SHA2-256, SHA256, SHA2-384, SHA384,',
                        '    SHA2-512, SHA512, SHA2-512/224, SHA512-224, SHA2-512/256, SHA512-256',
+                       '      SHA2-512/224, SHA2-512/256: FIPS 180-4, not truncated SHA2-512.',
                        '    SHA3-224, SHA3-256, SHA3-384, SHA3-512',
+                       '    BLAKE2B, BLAKE2B-BITS(128-512), BLAKE2S, BLAKE2S-BITS(128-256),',
+                       '    SHAKE128, SHAKE256, SHAKE128-BITS, SHAKE256-BITS(128-1024)',
+                       '      BITS: digest size of BLAKE2, output length of SHAKE by 8 bits.',
+                       '      e.g. -a blake2b-256, -a shake256-512',
                        '  -c, --check: Hash digest in checkfile check by the algorythm.',
                        '    algorythm priority: --algorythm option(1), The row info in the file(2)',
                        '    Ignore --algorythm option, if the file format are openssl, bsd style.',
+                       '  --update: Update the checkfile by the files.',
+                       '    New files are calculated, the rows of deleted files are removed.',
+                       '    The files changed after the checkfile was written are calculated again.',
                        '  --style: Output by the style. if --check option, Load by the style.',
                        '    openssl: openssl style, openssl dgst command',
                        '      e.g. MD5(/usr/bin/python3)= b804370957619edc6510439fed2b35b0',
@@ -923,16 +3318,77 @@ class Main_common(object):
                        '      e.g. MD5(/usr/bin/python3)= b804370957619edc6510439fed2b35b0',
                        '    GNU: GNU style, shasum, sha1sum~sha512sum GNU edition.',
                        '      e.g. f1768a9ca3017fe929fb463f2fd3c741b1394340  /usr/bin/python3',
+                       '  --recursive: calculate the files under the directories recursively.',
+                       '    Symbolic links are not followed.',
+                       '  --walk-jobs: walk the directories on N threads, --recursive option. default: 1',
+                       '    Output by walking order, or scanning order if --unordered.',
+                       '  -j, --jobs: calculate or verify files on N worker threads. default: 1',
+                       '    Output by input order(row order of checkfile).',
+                       '  --device-jobs: max worker threads of each device(st_dev), with --jobs.',
+                       '    The files wait on the queue of the device, the free worker takes',
+                       '    the file from the devices by round robin. default: not limited',
+                       '  --unordered: Output by completion order on --jobs option.',
+                       '  --output-prefix: Output to PREFIX.ALGORITHM file of each algorithm.',
+                       '      e.g. --output-prefix CHECKSUM: CHECKSUM.SHA2-256, CHECKSUM.SHA3-512',
+                       '  --cache: digest cache file, the file is not read if not changed.',
+                       '    The cache is keyed by device, inode, size, mtime, ctime and algorithm.',
+                       '    calcmode and --update only, checkmode reads the files always.',
+                       '  --xattr-cache: digest cache on extended attribute user.shacksum.ALGORITHM.',
+                       '    The digest is reused if mtime and size of the file are not changed.',
+                       '    calcmode and --update only, checkmode reads the files always.',
+                       '  --checkpoint: checkpoint file of the run, written every 1000 files or 10 seconds.',
+                       '    It is written on SIGINT, SIGTERM and removed on completion.',
+                       '  --resume: skip the completed files of --checkpoint file.',
+                       '    Append the output to the interrupted output, e.g. >> CHECKSUM.SHA256',
+                       '  --retry: retry count of failed open and read of the file. default: 2',
+                       '    The read is resumed from the last good block, not from the top.',
+                       '  --retry-interval: seconds before first retry, doubled by each retry.',
+                       '    0.1 to 120 seconds, up to 120 seconds. default: 1',
+                       '  --tree: calculate the tree digest by CHUNKSIZE, e.g. --tree 1M',
+                       '    The chunks of one file are calculated on --jobs threads(default: CPU count).',
+                       '    The algorithm is TREE<CHUNKSIZE>-<ALGORITHM>, e.g. TREE1M-SHA2-256.',
+                       '    CHUNKSIZE is power of 2, 64K to 1G. Not same as the plain digest.',
+                       '  --io: read method of the files. default: read',
+                       '    read: read() to the buffer.',
+                       '    mmap: mmap the file, fallback to read if failure to mmap.',
+                       '    auto: mmap if the file is large(20MB over), else read.',
+                       '    afalg: sendfile to Linux kernel crypto API, MD5, SHA1, SHA2, SHA3.',
+                       '      fallback to read if the algorithm is not supported by the kernel,',
+                       '      or --bwlimit, --iops-limit is set.',
+                       '    The holes of sparse files are not read, by SEEK_DATA and SEEK_HOLE.',
+                       '  --readahead: read the blocks on the reader thread while hashing, --io read.',
+                       '    N is queue depth of the blocks, 0 to 64. default: 0(not use)',
+                       '    e.g. --readahead 2: local disk, --readahead 8: network filesystem.',
+                       '  --prefetch: advise the kernel to read the next N files while hashing.',
+                       '    posix_fadvise(WILLNEED), 0 to 1024. default: 0(not use)',
+                       '    The statistics are printed to stderr by --verbose.',
+                       '  --io-policy: page cache policy of the read. default: normal',
+                       '    normal: default of the OS.',
+                       '    scrub: O_NOATIME, FADV_SEQUENTIAL, drop the read ranges by FADV_DONTNEED.',
+                       '      The cached pages of the file are dropped for all processes, read by the others too.',
+                       '  --bwlimit: limit the read bandwidth of all threads, bytes per second.',
+                       '    K, M, G suffix is 1024 based. e.g. --bwlimit 50M',
+                       '  --iops-limit: limit the read requests(1MB block) of all threads per second.',
+                       '  --ioprio-idle: set I/O scheduling class to idle, Linux.',
+                       '    The process reads when the other processes do not use the disk.',
                        '  --version: show version and information.',
+                       '  Progress of all files is printed to stderr, if stderr is terminal.',
+                       '    e.g. Progress: 1204.5 MB, 12 files, 350.2 MB/s',
+                       '  --progress: count the total ahead of the calculation, print % and ETA.',
+                       '    The files are walked or the checkfile rows are stat twice, by the thread.',
+                       '    e.g. Progress: 1204.5/5120.0 MB(23%), 12/40 files, 350.2 MB/s, ETA 0:00:11',
                        '',
                        'e.g.',
                        '  {0} --version'.format(scr_fname),
                        '  {0} -c CHECKSUM.SHA256'.format(scr_fname),
+                       '  {0} --update CHECKSUM.SHA256 --recursive .'.format(scr_fname),
                        '  {0} -a sha256 *.txt'.format(scr_fname),
                        '  {0} -a sha256 --style openssl *.txt'.format(
                            scr_fname),
                        '  {0} -a sha256 --style BSD *.txt'.format(scr_fname),
                        '  {0} -a sha256 --style GNU *.txt'.format(scr_fname),
+                       '  find . -type f | {0} -a sha256 --jobs 8 --stdin'.format(
+                           scr_fname),
                        '']
         if scr_fname == '':
             raise RuntimeError()
@@ -1004,19 +3460,233 @@ class Main_common(object):
             print('k:', k, 'v:', v)
         return
 
+    @staticmethod
+    def calc_fhashdgst_byargs(fpath: str, kind: str, normargs: Args_shacksum) -> (int, str, str):
+        '''
+          calc_fhashdgst() with the options of normalized arguments.
+        Return Value: same as calc_fhashdgst()
+        '''
+        flag, errmes, hashdgsts = Main_common.calc_fhashdgsts_byargs(
+            fpath, [kind], normargs)
+        if flag != True:
+            return flag, errmes, ''
+        return True, '', hashdgsts[0]
+
+    @staticmethod
+    def calc_fhashdgsts_byargs(fpath: str, kinds: list, normargs: Args_shacksum,
+                               fstat: os.stat_result = None) -> (int, str, list):
+        '''
+          calc_fhashdgsts() with the options of normalized arguments.
+        Return Value: same as calc_fhashdgsts()
+        '''
+        return Main_common.calc_fhashdgsts(fpath, kinds, iomode=normargs.io, fstat=fstat,
+                                           cache=Main_common.digestcache,
+                                           retry=normargs._retry,
+                                           retry_interval=normargs._retry_interval,
+                                           progress=Main_common.progress,
+                                           readahead=normargs._readahead,
+                                           iopolicy=normargs.io_policy,
+                                           throttle=Main_common.throttle)
+
+    @staticmethod
+    def _update_mmap(s, fp, filesize: int, blocksize: int, progress=None, throttle=None) -> bool:
+        '''
+          Update hash object by memoryview slices of mmap, not copy to bytes.
+        progress: Progressreport, the bytes are reported by each block.
+        throttle: Iothrottle, the block is taken before the page faults.
+        Return Value:
+          True : Success.
+          False: Failure to mmap(e.g. empty file, filesystem not support).
+                 s is not updated.
+        '''
+        if filesize == 0:
+            return False
+        try:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, OverflowError):
+            return False
+        try:
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)  # python 3.8 later
+            length = min(len(mm), filesize)
+            with memoryview(mm) as view:
+                for offset in range(0, length, blocksize):
+                    if throttle != None:
+                        throttle.acquire(min(blocksize, length - offset))
+                    s.update(view[offset: offset + blocksize])
+                    if progress != None:
+                        progress.update(min(blocksize, length - offset))
+        finally:
+            mm.close()
+        return True
+
     @staticmethod
     def calc_fhashdgst(fpath_arg: str, kind_arg: str, nocalc: bool = False,
-                       follow_symlinks: bool = False) -> (int, str, str):
+                       follow_symlinks: bool = False, iomode: str = 'READ') -> (int, str, str):
         '''
           Calculation file hash digest.
+        The arguments and return value are same as calc_fhashdgsts(),
+        except kind_arg(type=str) and hashdgst(type=str).
+        '''
+        if isinstance(kind_arg, str) != True:
+            errmes = 'kind_arg type is NOT string. [{0}]'.format(
+                repr(kind_arg))
+            return 10, errmes, ''
+        flag, errmes, hashdgsts = Main_common.calc_fhashdgsts(
+            fpath_arg, [kind_arg], nocalc=nocalc,
+            follow_symlinks=follow_symlinks, iomode=iomode)
+        if flag != True:
+            return flag, errmes, ''
+        return True, '', hashdgsts[0]
+
+    @staticmethod
+    def _open(fpath: str, noatime: bool = False):
+        '''
+          Open the file by 'rb'.
+        noatime(bool): O_NOATIME if permitted(owner of the file, CAP_FOWNER),
+          the access time is not updated.
+        '''
+        def opener(path: str, flags: int) -> int:
+            try:
+                return os.open(path, flags | os.O_NOATIME)
+            except PermissionError:
+                return os.open(path, flags)
+        if noatime and hasattr(os, 'O_NOATIME'):
+            return open(fpath, 'rb', opener=opener)
+        return open(fpath, 'rb')
+
+    @staticmethod
+    def _fadvise(fp, offset: int, length: int, advice: str):
+        '''
+          posix_fadvise() of the file, ignored if not supported.
+        advice(str): 'SEQUENTIAL', 'DONTNEED', 'WILLNEED'
+        '''
+        if hasattr(os, 'posix_fadvise') != True:
+            return
+        try:
+            os.posix_fadvise(fp.fileno(), offset, length,
+                             getattr(os, 'POSIX_FADV_' + advice))
+        except (OSError, ValueError):
+            pass  # e.g. closed on retry, the advice is only a hint.
+        return
+
+    @staticmethod
+    def _issparse(fp, filesize: int) -> bool:
+        '''
+          The file has holes(allocated blocks < size), SEEK_DATA and SEEK_HOLE are supported.
+        '''
+        if hasattr(os, 'SEEK_DATA') != True or filesize == 0:
+            return False
+        try:
+            blocks = getattr(os.fstat(fp.fileno()), 'st_blocks', None)
+        except OSError:
+            return False
+        return True if blocks != None and blocks * 512 < filesize else False
+
+    @staticmethod
+    def _nextdata(fd: int, offset: int, filesize: int) -> (int, int):
+        '''
+          Data extent of the sparse file by lseek(SEEK_DATA, SEEK_HOLE).
+        Return Value: (start, end) of the next data from offset.
+          (filesize, filesize): hole to the end of file.
+          (offset, filesize)  : failure to lseek, the rest is read as data.
+        '''
+        try:
+            start: int = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # no data after offset.
+                return filesize, filesize
+            return offset, filesize
+        try:
+            end: int = os.lseek(fd, start, os.SEEK_HOLE)
+        except OSError:
+            end = filesize
+        return min(start, filesize), min(end, filesize)
+
+    @staticmethod
+    def _new_hashobj(kind: str):
+        '''
+          Create hashlib object of the kind.
+        Return Value: hashlib object, None if unknown kind.
+        '''
+        formal: str = Const_SHA.aliases.get(kind, kind)
+        if kind == 'MD5':
+            return hashlib.md5()
+        elif kind == 'SHA1':
+            return hashlib.sha1()
+        elif kind in ['SHA224', 'SHA2-224']:
+            return hashlib.sha224()
+        elif kind in ['SHA256', 'SHA2-256']:
+            return hashlib.sha256()
+        elif kind in ['SHA384', 'SHA2-384']:
+            return hashlib.sha384()
+        elif kind in ['SHA512', 'SHA2-512']:
+            return hashlib.sha512()
+        elif kind in ['SHA2-512/224', 'SHA512-224']:
+            return Main_common._new_hashlib('SHA2-512/224', ('sha512_224', 'sha512-224'))
+        elif kind in ["SHA2-512/256", "SHA512-256"]:
+            return Main_common._new_hashlib('SHA2-512/256', ('sha512_256', 'sha512-256'))
+        elif kind in ['SHA3-224']:
+            return hashlib.sha3_224()
+        elif kind in ['SHA3-256']:
+            return hashlib.sha3_256()
+        elif kind in ['SHA3-384']:
+            return hashlib.sha3_384()
+        elif kind in ['SHA3-512']:
+            return hashlib.sha3_512()
+        elif kind not in Const_SHA.algorithmset:
+            return None
+        elif formal.startswith('BLAKE2B-'):
+            return hashlib.blake2b(digest_size=int(formal[8:]) // 8)
+        elif formal.startswith('BLAKE2S-'):
+            return hashlib.blake2s(digest_size=int(formal[8:]) // 8)
+        elif formal.startswith('SHAKE128-'):
+            return Hashshake(hashlib.shake_128(), int(formal[9:]) // 8)
+        elif formal.startswith('SHAKE256-'):
+            return Hashshake(hashlib.shake_256(), int(formal[9:]) // 8)
+        return None
+
+    @staticmethod
+    def _new_hashlib(kind: str, names: tuple):
+        '''
+          hashlib.new() by the name supported on the OpenSSL, detected at first call.
+        SHA2-512/224, SHA2-512/256 are not truncated SHA2-512, the initial values differ.
+          e.g. names: ('sha512_256', 'sha512-256')
+        Return Value: hashlib object, None if not supported(e.g. OpenSSL 1.1.0 before).
+        '''
+        name: str = Main_common.hashlibnames.get(kind, None)
+        if name == None:
+            name = ''
+            for candidate in names:
+                try:
+                    hashlib.new(candidate)
+                except ValueError:
+                    continue
+                name = candidate
+                break
+            Main_common.hashlibnames[kind] = name
+        return hashlib.new(name) if name != '' else None
+
+    @staticmethod
+    def calc_fhashdgsts(fpath_arg: str, kinds_arg: list, nocalc: bool = False,
+                        follow_symlinks: bool = False, iomode: str = 'READ',
+                        fstat: os.stat_result = None, cache=None, retry: int = 2,
+                        retry_interval: float = 1.0, progress=None,
+                        readahead: int = 0, iopolicy: str = 'NORMAL',
+                        throttle=None) -> (int, str, list):
+        '''
+          Calculation file hash digests of several algorithms by one read pass.
         Arguments
           fpath_arg(type=str): calculation filepath.
-          kind_arg(type=str) : Kind of hash digest. The strings is case-insensitive.
+          kinds_arg(type=list): Kind of hash digest of list. The strings is case-insensitive.
+            e.g. ['SHA2-256', 'SHA3-512']
             Enable kind_arg value are 'MD5', 'SHA1', 'SHA224', 'SHA256', 'SHA384', 'SHA512'.
         [proceed]
             Enable kind_arg value are 'MD5', 'SHA1', 'SHA2-224', 'SHA2-256', 'SHA2-384', 'SHA2-512'
                               'SHA2-512/224', "SHA2-512/256",
-                              "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512");
+                              "SHA3-224", "SHA3-256", "SHA3-384", "SHA3-512",
+                              "BLAKE2B-BITS", "BLAKE2S-BITS", "SHAKE128-BITS", "SHAKE256-BITS");
+                BITS is digest size of BLAKE2, output length of SHAKE. see Const_SHA.algorithms
           nocalc(type=bool): No-calculation. Return imitation hashdigest for debug.
             True : No calcuration.
                 dgst prefix-ptn: 1234567890abcedf 
@@ -1024,7 +3694,33 @@ class Main_common(object):
           follow_symlinks(type=bool): Decide to handle when filepath is symbolic link.
             True : Follow symbolic link.
             False: Do not follow symbolic link.
-        Return Value: (flag, errmes, hashdgst)
+          iomode(type=str): Read method of the file. The strings is case-insensitive.
+            'READ': read() to the buffer.
+            'MMAP': mmap the file, fallback to 'READ' if failure to mmap.
+            'AUTO': 'MMAP' if the file is large(20MB over), else 'READ'.
+            'AFALG': Linux kernel crypto API by sendfile(), fallback to 'READ'
+                     if the algorithm is not supported or throttle is set. see Hashafalg.
+          fstat(type=os.stat_result): stat of fpath_arg, e.g. os.DirEntry.stat() result.
+            None      : stat fpath_arg, unicode normalize fpath_arg.
+            stat value: Not stat again, fpath_arg is used as is.
+          cache(type=Digestcache, Xattrcache): digest cache,
+            the file is not read if the stat is not changed.
+            None: Not use the cache.
+          retry(type=int): retry count of failed open and read.
+            The read is resumed from the offset of last good block, not from the top.
+          retry_interval(type=float): seconds before first retry, doubled by each retry.
+          progress(type=Progressreport): the read bytes are reported, None: not report.
+          readahead(type=int): queue depth of the reader thread on 'READ', see Hashreader.
+            0: Not use the reader thread, reading and hashing alternate.
+          iopolicy(type=str): page cache policy of the read. The strings is case-insensitive.
+            'NORMAL': default of the OS.
+            'SCRUB' : O_NOATIME, FADV_SEQUENTIAL, the read ranges are dropped by FADV_DONTNEED.
+                      FADV_DONTNEED drops the cached pages of the file for every process,
+                      the pages read by the other processes are dropped too.
+                      'MMAP' is not used.
+          throttle(type=Iothrottle): bandwidth and IOPS limit shared by the threads.
+            None: unlimited. The block is 1MB if limited.
+        Return Value: (flag, errmes, hashdgsts)
           flag(type=int): 
             True : Success to calculate.
             False: Failure to calculate.
@@ -1036,56 +3732,68 @@ class Main_common(object):
           errmes(type=str):
             Empty      : Success.
             Some string: Failure.
-          hashdgst(type=str):
+          hashdgsts(type=list):
             Empty      : Failure.
-            Some string: Hash digest string ,if success.
+            Hash digest strings by order of kinds_arg, if success.
         '''
-        retry_func = 2
-        interval_func = 1   # interval of retrying.
+        retry_func = retry
+        interval_func = retry_interval   # interval of retrying.
         interval_func_min = 0.1
         interval_func_max = 120
-        length_dic = {'MD5': 32, 'SHA1': 40,
-                      'SHA224': 56,  'SHA2-224': 56, 'SHA3-224': 56, 'SHA2-512/224': 56, 'SHA512-224': 56,
-                      'SHA256': 64,  'SHA2-256': 64, 'SHA3-256': 64, 'SHA2-512/256': 64, 'SHA512-256': 64,
-                      'SHA384': 96,  'SHA2-384': 96, 'SHA3-384': 96,
-                      'SHA512': 128, 'SHA2-512': 128, 'SHA3-512': 128}
-        print_progress = True  # print progress, if 1GB over.
-        print_progress_minsize = 1073741824  # min, 1GB
         try:
-            kind = kind_arg.upper()
+            kinds = [kind_arg.upper() for kind_arg in kinds_arg]
         except:
-            errmes = 'kind_arg type is NOT string. [{0}]'.format(
-                repr(kind_arg))
-            return 10, errmes, ''
+            errmes = 'kinds_arg type is NOT string of list. [{0}]'.format(
+                repr(kinds_arg))
+            return 10, errmes, []
         flag, errmes = LPYknife.isbool(nocalc, varname='nocalc')
         if flag != True:
-            return flag, errmes, ''
+            return flag, errmes, []
         flag, errmes = LPYknife.isbool(
             follow_symlinks, varname='follow_symlinks')
         if flag != True:
-            return flag, errmes, ''
-        if len(kind) >= 13:  # most long length = 12, "SHA2-512/256"
-            errmes = 'kind_arg strings is too long. [ kind_arg = {0}]'.format(
-                kind_arg)
-            return 15, errmes, ''
-        chklist = [True for s in length_dic.keys() if s == kind]
-        if not any(chklist):
-            errmes = 'kind_arg string mismatch MD5, SHA1, SHA224, SHA256,' +\
-                     ' SHA384, SHA512. [ kind_arg = {0}]'.format(kind_arg)
-            return 15, errmes, ''
+            return flag, errmes, []
+        if isinstance(iomode, str) != True or iomode.upper() not in Const_SHA.iomodes:
+            errmes = 'iomode string mismatch READ, MMAP, AUTO, AFALG. [ iomode = {0}]'.format(
+                repr(iomode))
+            return 15, errmes, []
+        if isinstance(iopolicy, str) != True or iopolicy.upper() not in Const_SHA.iopolicies:
+            errmes = 'iopolicy string mismatch NORMAL, SCRUB. [ iopolicy = {0}]'.format(
+                repr(iopolicy))
+            return 15, errmes, []
+        scrub: bool = True if iopolicy.upper() == 'SCRUB' else False
+        if len(kinds) == 0:
+            errmes = 'kinds_arg is empty list.'
+            return 15, errmes, []
+        for kind in kinds:
+            if len(kind) >= 32:  # most long length = 21, "TREE256K-SHA2-512/256"
+                errmes = 'kind_arg strings is too long. [ kind_arg = {0}]'.format(
+                    kind)
+                return 15, errmes, []
+            if Const_SHA.isalgorithm(kind) != True:
+                errmes = 'kind_arg string mismatch MD5, SHA1, SHA2, SHA3, BLAKE2B,' +\
+                         ' BLAKE2S, SHAKE128, SHAKE256. [ kind_arg = {0}]'.format(kind)
+                return 15, errmes, []
+        treechunk: int = Const_SHA.treealgorithm(kinds[0])[0]
+        for kind in kinds:
+            if Const_SHA.treealgorithm(kind)[0] != treechunk:
+                errmes = 'kind_arg mixes the tree digest chunk sizes. [ kinds_arg = {0}]'.format(
+                    repr(kinds_arg))
+                return 15, errmes, []
         if nocalc:
             headptn = '1234567890abcedf'
-            tailptn = kind_arg.upper().lstrip('SHAMD')
-            return True, '', LPYknife.randomstrings(length_dic[kind], letters=headptn, prefix=headptn, suffix=tailptn)
+            return True, '', [LPYknife.randomstrings(Const_SHA.hexlength(kind), letters=headptn,
+                                                     prefix=headptn, suffix=kind.lstrip('SHAMD'))
+                              for kind in kinds]
         if not (interval_func_min <= interval_func <= interval_func_max):
             errmes = 'interval_func value is out of range. ' +\
                      '[min = {0}, max = {1}, interval_func = {2}]'.format(interval_func_min,
                                                                           interval_func_max,
                                                                           interval_func)
-            return False, errmes, ''
+            return False, errmes, []
         fpath = fpath_arg
         if fpath_arg.endswith('\n'):
-            warnmes = '\n  Warning: Find \\n charcators of fpath tail in calc_fhashdgst().' +\
+            warnmes = '\n  Warning: Find \\n charcators of fpath tail in calc_fhashdgsts().' +\
                       ' [fpath={0}] '.format(fpath)
             warnings.warn(warnmes)
         i = fpath.find('\n')
@@ -1093,19 +3801,44 @@ class Main_common(object):
             errmes = 'Illegal \\n mark in the fpath strings. [fpath = {0}]'.format(
                 fpath)
             raise ValueError(errmes)
-        fpath = Main_common.unicodenormalized_fpath_exists(fpath_arg)
-        if os.path.isfile(fpath) != True:
-            errmes = 'fpath is not regular file. [fpath = {0}]'.format(fpath)
-            return False, errmes, ''
-        if follow_symlinks != True and os.path.islink(fpath) == True:
-            errmes = 'fpath is symbolic link. Not regular file. [fpath = {0}]'.format(
-                fpath)
-            return False, errmes, ''
+        if fstat != None:
+            fpath = fpath_arg
+            if stat.S_ISLNK(fstat.st_mode) and follow_symlinks != True:
+                errmes = 'fpath is symbolic link. Not regular file. [fpath = {0}]'.format(
+                    fpath)
+                return False, errmes, []
+            if stat.S_ISREG(fstat.st_mode) != True:
+                errmes = 'fpath is not regular file. [fpath = {0}]'.format(
+                    fpath)
+                return False, errmes, []
+        else:
+            fpath = Main_common.unicodenormalized_fpath_exists(fpath_arg)
+            if os.path.isfile(fpath) != True:
+                errmes = 'fpath is not regular file. [fpath = {0}]'.format(
+                    fpath)
+                return False, errmes, []
+            if follow_symlinks != True and os.path.islink(fpath) == True:
+                errmes = 'fpath is symbolic link. Not regular file. [fpath = {0}]'.format(
+                    fpath)
+                return False, errmes, []
+        if cache != None:
+            try:
+                cachestat = fstat if fstat != None else os.stat(fpath)
+            except OSError:
+                cachestat = None
+            if cachestat != None:
+                hexdigests = [cache.lookup(fpath, cachestat, kind)
+                              for kind in kinds]
+                if all(hexdigests):
+                    if progress != None:
+                        progress.add_file(skipped=cachestat.st_size)
+                    return True, '', hexdigests
         loopflag = False
-        for i in LPYknife.retry_iter(retry=retry_func, interval=interval_func):
+        for i in LPYknife.backoff_iter(retry=retry_func, interval=interval_func,
+                                       maxinterval=interval_func_max):
             try:
-                fp = open(fpath, 'rb')
-            except:
+                fp = Main_common._open(fpath, noatime=scrub)
+            except OSError:
                 continue
             else:
                 loopflag = True
@@ -1113,65 +3846,72 @@ class Main_common(object):
         if loopflag == False:
             errmes = 'Can not open the file. [fpath = {0}]'.format(fpath)
             raise RuntimeError(errmes)
-            return 11, errmes, ''
-        if kind == 'MD5':
-            s = hashlib.md5()
-        elif kind == 'SHA1':
-            s = hashlib.sha1()
-        elif kind in ['SHA224', 'SHA2-224']:
-            s = hashlib.sha224()
-        elif kind in ['SHA256', 'SHA2-256']:
-            s = hashlib.sha256()
-        elif kind in ['SHA384', 'SHA2-384']:
-            s = hashlib.sha384()
-        elif kind in ['SHA512', 'SHA2-512', 'SHA2-512/224', 'SHA512-224', "SHA2-512/256", "SHA512-256"]:
-            s = hashlib.sha512()
-        elif kind in ['SHA3-224']:
-            s = hashlib.sha3_224()
-        elif kind in ['SHA3-256']:
-            s = hashlib.sha3_256()
-        elif kind in ['SHA3-384']:
-            s = hashlib.sha3_384()
-        elif kind in ['SHA3-512']:
-            s = hashlib.sha3_512()
-        else:
-            errmes = 'Hash digest kind is unknown. [kind = {0}]'.format(kind)
-            return 15, errmes, ''
-        filesize = os.path.getsize(fpath)
+            return 11, errmes, []
+        basekinds: list = [Const_SHA.treealgorithm(kind)[1] if treechunk != 0 else kind
+                           for kind in kinds]
+        hashobjs: list = [Main_common._new_hashobj(kind) for kind in basekinds]
+        for kind, hashobj in zip(basekinds, hashobjs):
+            if hashobj == None:
+                fp.close()
+                errmes = 'Hash digest kind is unknown. [kind = {0}]'.format(
+                    kind)
+                if kind in Const_SHA.algorithmset:
+                    errmes = 'Hash digest kind is not supported by hashlib(OpenSSL). [kind = {0}]'
+                    errmes = errmes.format(kind)
+                return 15, errmes, []
+        s = Hashmulti(hashobjs)
+        filesize = fstat.st_size if fstat != None else os.path.getsize(fpath)
         largeblock = 20971520  # 20M
-        if filesize < largeblock:
-            blocksize = 1048576    # 1M
-            loopcount = filesize // blocksize
-            remainder = filesize % blocksize
-        elif filesize >= largeblock:
-            loopcount = filesize // largeblock
-            remainder = filesize % largeblock
-            blocksize = largeblock
-        s_origin = s
+        blocksize = 1048576 if filesize < largeblock else largeblock  # 1M, 20M
+        blocksize = 1048576 if throttle != None else blocksize  # smooth rate.
+        blocksize = 1048576 if readahead >= 1 else blocksize  # the ring is depth + 2 blocks.
         loopflag = False
-        for i in LPYknife.retry_iter(retry=retry_func, interval=interval_func):
-            try:
-                s.update(fp.read(remainder))
-                for j in range(0, loopcount):
-                    buf = fp.read(blocksize)
-                    s.update(buf)
-                    del buf
-                    if print_progress and filesize > print_progress_minsize:  # 1GB over
-                        total = loopcount * blocksize + remainder
-                        readbyte = j * blocksize + remainder
-                        mes = 'Progress: Total: {0}, Percent: {1}, Read: {2}\r'.format(
-                            total, readbyte*100//total, readbyte)
-                        print(mes, end='', file=sys.stderr)
-            except:
-                s = s_origin
-                fp.seek(0)
-                continue
-            else:
-                loopflag = True
-                break
+        usemmap: bool = False
+        if iomode.upper() == 'MMAP':
+            usemmap = True
+        elif iomode.upper() == 'AUTO':
+            usemmap = True if filesize >= largeblock else False
+        if scrub:
+            usemmap = False  # the mapped pages are not dropped by the range.
+            Main_common._fadvise(fp, 0, 0, 'SEQUENTIAL')
+        afalgdigests: list = list()
+        if iomode.upper() == 'AFALG' and treechunk == 0 and throttle == None:
+            # the throttled read is by 1MB blocks, the kernel is not used.
+            afalgdigests = Hashafalg.calc(fp, filesize, basekinds)
+            loopflag = True if len(afalgdigests) >= 1 else False
+            if loopflag and progress != None:
+                progress.update(filesize)
+        sparse: bool = Main_common._issparse(fp, filesize)
+        usemmap = False if sparse else usemmap  # the holes are not read, see below.
+        if treechunk != 0:
+            s = Hashtree(hashobjs, treechunk, scrub=scrub)  # the chunks are read by pread().
+            usemmap = False
+            loopflag = s.calc(fp, filesize, retry=retry_func, interval=interval_func,
+                              maxinterval=interval_func_max, progress=progress,
+                              throttle=throttle)
+        if usemmap and loopflag != True:
+            s_mmap = s.copy()  # s is not changed if failure to mmap.
+            loopflag = Main_common._update_mmap(
+                s_mmap, fp, filesize, blocksize, progress=progress, throttle=throttle)
+            s = s_mmap if loopflag else s
+        if loopflag != True and treechunk == 0:
+            # s is updated after the block is read completely,
+            # it is the state of last good offset on read error.
+            reader = Hashreader(fp, fpath, filesize, blocksize, sparse=sparse, retry=retry_func,
+                                interval=interval_func, maxinterval=interval_func_max,
+                                scrub=scrub, throttle=throttle)
+            for block in reader.readahead(readahead) if readahead >= 1 else reader.blocks():
+                s.update(block)
+                if progress != None:
+                    progress.update(len(block))
+            fp = reader.fp
+            loopflag = reader.ok
+        if scrub:
+            Main_common._fadvise(fp, 0, 0, 'DONTNEED')  # the rest, e.g. --io afalg.
         if loopflag != True:
+            fp.close()
             errmes = 'file read error. [fpath = {0}]'.format(fpath)
-            return 20, errmes, ''
+            return 20, errmes, []
         fp.close()
         while fp.closed != True:
             n = None
@@ -1183,12 +3923,13 @@ class Main_common(object):
                 mes = 'Warning: Wait to close file pointer.'
                 print(mes, file=sys.stderr)
             time.sleep(1)
-        hexdigest = s.hexdigest()
-        if kind in ["SHA2-512/224", "SHA512-224"]:
-            hexdigest = hexdigest[:56]  # 56 length.
-        if kind in ["SHA2-512/256", "SHA512-256"]:
-            hexdigest = hexdigest[:64]  # 64 length.
-        return True, '', hexdigest
+        hexdigests: list = afalgdigests if len(afalgdigests) >= 1 else s.hexdigests()
+        if cache != None and cachestat != None:
+            for kind, hexdigest in zip(kinds, hexdigests):
+                cache.store(fpath, cachestat, kind, hexdigest)
+        if progress != None:
+            progress.add_file()
+        return True, '', hexdigests
 
     @staticmethod
     def unicodenormalized_fpath_exists(fpath: str) -> str:
@@ -1233,19 +3974,53 @@ def main_common():
     args.checkmethod()
     normargs = args
     normargs.normalize()
-    if normargs._checkmode:
-        checkmode = Runcheckmode()  # print('Run check mode')
-        checkmode.run(normargs)  # Run --check mode.
-        exit(0)
-    if normargs._calcmode:
-        calcmode = Runcalcmode()
-        calcmode.run(normargs)
-    else:
-        errmes = 'Error: Not found check file. [{0}]'.format(normargs.check)
-        errmes = unicodedata.normalize('NFD', errmes)
+    if normargs.cache != '':
+        Main_common.digestcache = Digestcache(normargs.cache)
+    elif normargs.xattr_cache:
+        Main_common.digestcache = Xattrcache()
+    if sys.stderr.isatty():
+        Main_common.progress = Progressreport()
+    if normargs._prefetch >= 1:
+        Main_common.prefetcher = Prefetcher(normargs._prefetch)
+    if normargs._bwlimit >= 1 or normargs._iops_limit >= 1:
+        Main_common.throttle = Iothrottle(normargs._bwlimit, normargs._iops_limit)
+    if normargs.ioprio_idle and Iothrottle.setidle() != True:
+        errmes = 'Warning: Can not set the I/O scheduling class to idle.'
         print(errmes, file=sys.stderr)
-        print('Under construction', file=sys.stderr)
-        exit(1)
+    if normargs.jobs != '':
+        Hashtree.jobs = normargs._jobs  # threads of the tree digest chunks.
+    # each worker keeps the buffers of the reader ring, not allocated by each file.
+    Main_common.bufferpool = Hashbufferpool(
+        maxbuffers=max(4, normargs._jobs * (normargs._readahead + 2) + Hashtree.jobs))
+    try:
+        if normargs._updatemode:
+            updatemode = Runupdatemode()
+            updatemode.run(normargs)  # Run --update mode.
+            exit(0)
+        if normargs._checkmode:
+            checkmode = Runcheckmode()  # print('Run check mode')
+            checkmode.run(normargs)  # Run --check mode.
+            exit(0)
+        if normargs._calcmode:
+            calcmode = Runcalcmode()
+            calcmode.run(normargs)
+        else:
+            errmes = 'Error: Not found check file. [{0}]'.format(
+                normargs.check)
+            errmes = unicodedata.normalize('NFD', errmes)
+            print(errmes, file=sys.stderr)
+            print('Under construction', file=sys.stderr)
+            exit(1)
+    finally:
+        Hashtree.shutdown()
+        if Main_common.progress != None:
+            Main_common.progress.finish()
+        if Main_common.prefetcher != None and normargs.verbose:
+            Main_common.prefetcher.print_stats()
+        if Main_common.throttle != None and normargs.verbose:
+            Main_common.throttle.print_stats()
+        if Main_common.digestcache != None:
+            Main_common.digestcache.save()
     exit(0)
 
 
@@ -0,0 +1,118 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'script', 'shacksum.py')
+
+
+def shacksum(args: list, cwd: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, SCRIPT] + args, cwd=cwd,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+
+class Test_update(unittest.TestCase):
+    '''
+      --update option, the rows are relative to the checkfile directory.
+    '''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.top = self.tmp.name
+        self.mdir = os.path.join(self.top, 'm')
+        self.other = os.path.join(self.top, 'other')
+        os.makedirs(os.path.join(self.mdir, 'sub'))
+        os.makedirs(self.other)
+        for name, data in [('a', b'aaa'), (os.path.join('sub', 'b'), b'bbb')]:
+            fpath = os.path.join(self.mdir, name)
+            with open(fpath, 'wb') as fp:
+                fp.write(data)
+            os.utime(fpath, (1000000000, 1000000000))  # older than the run.
+        self.checkfile = os.path.join(self.mdir, 'CHECKSUM')
+        return
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        return
+
+    def update(self, cwd: str, files: list) -> tuple:
+        r = shacksum(['--update', self.checkfile, '--recursive', '-a', 'sha2-256'] + files, cwd)
+        self.assertEqual(r.returncode, 0, r.stderr)
+        m = re.search(r'calculated (\d+), reused (\d+), removed (\d+)', r.stderr)
+        return int(m.group(1)), int(m.group(2)), int(m.group(3))
+
+    def test_other_cwd(self):
+        self.assertEqual(self.update(self.other, [os.path.join('..', 'm')]), (2, 0, 0))
+        with open(self.checkfile, 'rt') as fp:
+            rows = sorted(fp.read().splitlines())
+        self.assertEqual(rows[0].split('(')[1].split(')')[0], 'a')
+        self.assertEqual(rows[1].split('(')[1].split(')')[0], os.path.join('sub', 'b'))
+        for cwd in [self.top, self.mdir, self.other]:
+            r = shacksum(['-c', self.checkfile], cwd)
+            self.assertEqual(r.returncode, 0, r.stdout + r.stderr)
+        self.assertEqual(self.update(self.mdir, ['.']), (0, 2, 0))
+        self.assertEqual(self.update(self.top, ['m']), (0, 2, 0))
+        return
+
+    def test_changed_while_run(self):
+        self.update(self.mdir, ['.'])
+        # changed after the checkfile was written, mtime is newer than the run start.
+        fpath = os.path.join(self.mdir, 'a')
+        with open(fpath, 'wb') as fp:
+            fp.write(b'changed')
+        st = os.stat(self.checkfile)
+        os.utime(fpath, ns=(st.st_mtime_ns, st.st_mtime_ns))
+        self.assertEqual(self.update(self.mdir, ['.']), (1, 1, 0))
+        r = shacksum(['-c', self.checkfile], self.other)
+        self.assertEqual(r.returncode, 0, r.stdout + r.stderr)
+        return
+
+    def test_nested_styles(self):
+        os.makedirs(os.path.join(self.mdir, 'sub', 'deep'))
+        for name, data in [('b', b'bbb'), (os.path.join('sub', 'deep', 'c'), b'ccc')]:
+            with open(os.path.join(self.mdir, name), 'wb') as fp:
+                fp.write(data)  # ./b is same content as sub/b.
+        for style in ['GNU', 'BSD']:
+            if os.path.exists(self.checkfile):
+                os.remove(self.checkfile)
+            r = shacksum(['--update', self.checkfile, '--recursive', '--style', style,
+                          '-a', 'sha2-256', '.'], self.mdir)
+            self.assertEqual(r.returncode, 0, r.stderr)
+            r = shacksum(['--recursive', '--style', style, '-a', 'sha2-256', '.'], self.mdir)
+            self.assertEqual(r.returncode, 0, r.stderr)
+            calcfile = os.path.join(self.mdir, 'CALC')
+            with open(calcfile, 'wt') as fp:
+                fp.write(r.stdout)
+            for checkfile in [self.checkfile, calcfile]:
+                r = shacksum(['-c', checkfile, '-a', 'sha2-256'], self.other)
+                self.assertEqual(r.returncode, 0, style + r.stdout + r.stderr)
+                self.assertIn(os.path.join('sub', 'deep', 'c'), r.stdout)
+            fpath = os.path.join(self.mdir, 'sub', 'b')
+            with open(fpath, 'wb') as fp:
+                fp.write(b'BBB')  # not same as ./b
+            r = shacksum(['-c', calcfile, '-a', 'sha2-256'], self.other)
+            self.assertNotEqual(r.returncode, 0, style + r.stdout)
+            with open(fpath, 'wb') as fp:
+                fp.write(b'bbb')
+            os.remove(calcfile)
+        return
+
+    def test_mtime_is_run_start(self):
+        fpath = os.path.join(self.mdir, 'large')
+        with open(fpath, 'wb') as fp:
+            fp.write(b'\0' * 3145728)
+        start = time.time()
+        r = shacksum(['--update', self.checkfile, '--bwlimit', '1M', '-a', 'sha2-256', fpath],
+                     self.mdir)  # about 2 seconds.
+        self.assertEqual(r.returncode, 0, r.stderr)
+        self.assertGreater(time.time() - start, 1.5)
+        self.assertLess(os.stat(self.checkfile).st_mtime, start + 1.0)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()